@@ -9,6 +9,8 @@ class BotConfig(BaseSettings):
     errors_trace_channel: int
     info_channel: int
     stats_channel: int
+    timer_journal: t.Optional[str] = None
+    timer_backend: t.Literal["postgres", "postgres_leased", "redis"] = "postgres"
 
     class Config:
         env_file = ".env"
@@ -1,3 +1,4 @@
 from .bot import Airy
 from airy.core.bot.utils import ErrorForUser
 from .models import *
+from .services import *
@@ -13,11 +13,14 @@ from lightbulb.app import BotApp
 from tortoise import Tortoise
 
 from airy.config import tortoise_config, bot_config, BotConfig
+from airy.utils.cache import redis_broker
 from airy.utils.time import utcnow, format_dt
 from ..api.client import HttpServer
 from ..log import log_config
+from ..models import apply_migrations
 from ..models.context import *
-from ..scheduler import Scheduler
+from ..services import GuildConfigService, MutedMemberService
+from ..scheduler import Scheduler, FileTimerJournal, TimerBackend, RedisTimerBackend, LeasedPostgresTimerBackend
 from ...utils import db_backup
 
 log = logging.getLogger(__name__)
@@ -52,12 +55,24 @@ class Airy(BotApp, ABC):
         self._config = bot_config
 
         self.redis = aioredis.from_url(url="redis://localhost:6379")
-        self._scheduler = Scheduler(self)
+        self._scheduler = Scheduler(self,
+                                    journal=FileTimerJournal(bot_config.timer_journal)
+                                    if bot_config.timer_journal else None,
+                                    backend=self._make_timer_backend())
+        self._guild_config = GuildConfigService(self)
+        self._muted_members = MutedMemberService(self)
         # self.http_server = HttpServer()
         self.load_extensions_from("./airy/extensions")
         self.create_subscriptions()
         miru.load(self)
 
+    def _make_timer_backend(self) -> t.Optional[TimerBackend]:
+        if self._config.timer_backend == "redis":
+            return RedisTimerBackend(self.redis)
+        if self._config.timer_backend == "postgres_leased":
+            return LeasedPostgresTimerBackend()
+        return None
+
     @property
     def config(self) -> BotConfig:
         return self._config
@@ -85,6 +100,14 @@ class Airy(BotApp, ABC):
     def scheduler(self) -> Scheduler:
         return self._scheduler
 
+    @property
+    def guild_config(self) -> GuildConfigService:
+        return self._guild_config
+
+    @property
+    def muted_members(self) -> MutedMemberService:
+        return self._muted_members
+
     async def wait_until_started(self) -> None:
         """
         Wait until the bot has started up
@@ -95,6 +118,7 @@ class Airy(BotApp, ABC):
         self.subscribe(hikari.StartingEvent, self.on_starting)
         self.subscribe(hikari.StartedEvent, self.on_started)
         self.subscribe(hikari.GuildAvailableEvent, self.on_guild_available)
+        self.subscribe(hikari.GuildLeaveEvent, self.guild_config.on_guild_leave)
         self.subscribe(lightbulb.LightbulbStartedEvent, self.on_lightbulb_started)
         self.subscribe(hikari.StoppingEvent, self.on_stopping)
 
@@ -103,6 +127,7 @@ class Airy(BotApp, ABC):
         log.info("Connecting to Database...")
         await Tortoise.init(config=tortoise_config)
         await Tortoise.generate_schemas(safe=True)
+        await apply_migrations()
         log.info("Connected to Database.")
 
     def load_extensions_from(
@@ -142,6 +167,12 @@ class Airy(BotApp, ABC):
         loop = asyncio.get_event_loop()
         # loop.create_task(self.http_server.start())
         await self.connect_db()
+        await self.muted_members.load()
+        try:
+            await redis_broker.start(self.redis)
+        except Exception as e:
+            # Shared caches then only use their local tier
+            log.error(f"Failed to start the redis cache broker: {e}")
         await self.scheduler.start()
 
     async def on_started(self, event: hikari.StartedEvent) -> None:
@@ -150,7 +181,7 @@ class Airy(BotApp, ABC):
         self._user_id = user.id if user else None
 
     async def on_stopping(self, event: hikari.StoppingEvent) -> None:
-        pass
+        await redis_broker.stop()
 
     async def get_slash_context(
             self,
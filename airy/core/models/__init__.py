@@ -1,5 +1,6 @@
 from .context import *
 from .db import *
 from .errors import *
+from .migrations import apply_migrations
 from .plugin import AiryPlugin
 from .views import *
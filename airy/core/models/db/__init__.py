@@ -1,4 +1,4 @@
-from .guild import GuildModel
+from .guild import GuildModel, RaidMode
 from .rooms import VoiceChannelCreatorModel
 from .rolebuttons import *
 from .user import *
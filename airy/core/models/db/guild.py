@@ -20,19 +20,7 @@ class GuildModel(Model):
     broadcast_channel = fields.BigIntField(null=True)
     mention_count = fields.SmallIntField(null=True)
     mute_role_id = fields.BigIntField(null=True)
-    extra: dict = fields.JSONField(default={'muted_members': [], "safe_mention_channel_ids": []})
-
-    @property
-    def muted_members(self) -> t.List[int]:
-        return self.extra.get('muted_members')
-
-    @muted_members.setter
-    def muted_members(self, value):
-        self.muted_members = value
-
-    @muted_members.deleter
-    def muted_members(self):
-        self.muted_members = self.extra['muted_members'] = []
+    extra: dict = fields.JSONField(default={"safe_mention_channel_ids": []})
 
     @property
     def safe_mention_channel_ids(self) -> t.List[int]:
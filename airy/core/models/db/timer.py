@@ -10,9 +10,16 @@ class TimerModel(Model):
     created = fields.DatetimeField(default=utcnow())
     event = fields.TextField()
     extra = fields.JSONField(default={})
+    lease_owner = fields.TextField(null=True)
+    lease_expires = fields.DatetimeField(null=True, index=True)
+
+    owner_id = fields.BigIntField(null=True)
+    guild_id = fields.BigIntField(null=True)
+    target_id = fields.BigIntField(null=True)
 
     class Meta:
         """Metaclass to set table name and description"""
 
         table = "timer"
         table_description = "Stores information about the timer"
+        indexes = (("event", "owner_id", "expires"), ("event", "guild_id", "target_id"))
@@ -0,0 +1,58 @@
+import logging
+
+from tortoise import Tortoise
+
+__all__ = ("apply_migrations",)
+
+log = logging.getLogger(__name__)
+
+# `generate_schemas` only creates missing tables, columns added to existing models are migrated here.
+# Every statement has to be idempotent, they are all executed on each startup.
+MIGRATIONS = (
+    ("timer leases",
+     """
+     ALTER TABLE "timer" ADD COLUMN IF NOT EXISTS "lease_owner" TEXT;
+     ALTER TABLE "timer" ADD COLUMN IF NOT EXISTS "lease_expires" TIMESTAMPTZ;
+     CREATE INDEX IF NOT EXISTS "idx_timer_lease_e_eef056" ON "timer" ("lease_expires");
+     """),
+    ("timer owner, guild and target columns",
+     """
+     ALTER TABLE "timer" ADD COLUMN IF NOT EXISTS "owner_id" BIGINT;
+     ALTER TABLE "timer" ADD COLUMN IF NOT EXISTS "guild_id" BIGINT;
+     ALTER TABLE "timer" ADD COLUMN IF NOT EXISTS "target_id" BIGINT;
+     UPDATE "timer" SET "owner_id" = ("extra" -> 'args' ->> 0)::BIGINT
+         WHERE "event" = 'reminder' AND "owner_id" IS NULL;
+     UPDATE "timer" SET "owner_id" = ("extra" -> 'args' ->> 0)::BIGINT,
+                        "target_id" = ("extra" -> 'args' ->> 1)::BIGINT,
+                        "guild_id" = ("extra" -> 'args' ->> 2)::BIGINT
+         WHERE "event" = 'mute' AND "owner_id" IS NULL;
+     CREATE INDEX IF NOT EXISTS "idx_timer_event_ad47ac" ON "timer" ("event", "owner_id", "expires");
+     CREATE INDEX IF NOT EXISTS "idx_timer_event_db95aa" ON "timer" ("event", "guild_id", "target_id");
+     """),
+    # Tortoise has no composite primary keys, so this table has no model and is only created here
+    ("muted_member table",
+     """
+     CREATE TABLE IF NOT EXISTS "muted_member" (
+         "guild_id" BIGINT NOT NULL,
+         "user_id" BIGINT NOT NULL,
+         "expires" TIMESTAMPTZ,
+         PRIMARY KEY ("guild_id", "user_id")
+     );
+     INSERT INTO "muted_member" ("guild_id", "user_id")
+         SELECT "guild_id", jsonb_array_elements_text("extra" -> 'muted_members')::BIGINT FROM "guild"
+         WHERE jsonb_typeof("extra" -> 'muted_members') = 'array'
+         ON CONFLICT DO NOTHING;
+     UPDATE "muted_member" AS "m" SET "expires" = "t"."expires" FROM "timer" AS "t"
+         WHERE "t"."event" = 'mute' AND "t"."guild_id" = "m"."guild_id" AND "t"."target_id" = "m"."user_id"
+           AND "m"."expires" IS NULL;
+     UPDATE "guild" SET "extra" = "extra" - 'muted_members' WHERE "extra" ? 'muted_members';
+     """),
+)
+
+
+async def apply_migrations(connection_name: str = "default") -> None:
+    connection = Tortoise.get_connection(connection_name)
+
+    for name, sql in MIGRATIONS:
+        log.debug(f"Applying migration: {name}")
+        await connection.execute_script(sql)
@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import functools
+import heapq
 import logging
 import re
+import time as _time
 import typing as t
 
-import Levenshtein as lev
+import attr
 import dateparser
 import hikari
 from hikari.internal.enums import Enum
@@ -14,16 +17,30 @@ from hikari.internal.enums import Enum
 from airy.core.models import TimerModel, UserModel
 from airy.core.tasks import IntervalLoop
 from airy.utils import utcnow
+from airy.utils.cache import cache, LRU, Strategy
 from .consts import *
-from .timers import BaseTimerEvent, timers
+from .timers import BaseTimerEvent, RecurringTimerEvent, timers
+from .backends import TimerBackend, PostgresTimerBackend, LeasedPostgresTimerBackend, RedisTimerBackend
+from .wheel import TimingWheel, TimerJournal, FileTimerJournal, RedisTimerJournal
 
 if t.TYPE_CHECKING:
     from ..bot import Airy
 
 
 __all__ = ("ConversionMode",
+           "parse_relative_time",
+           "get_user_timezone",
            "Scheduler",
-           "BaseTimerEvent")
+           "BaseTimerEvent",
+           "RecurringTimerEvent",
+           "TimerBackend",
+           "PostgresTimerBackend",
+           "LeasedPostgresTimerBackend",
+           "RedisTimerBackend",
+           "TimingWheel",
+           "TimerJournal",
+           "FileTimerJournal",
+           "RedisTimerJournal")
 
 BaseTimerEventT = t.TypeVar('BaseTimerEventT', bound=BaseTimerEvent)
 logger = logging.getLogger("airy.core.Scheduler")
@@ -36,6 +53,40 @@ class ConversionMode(int, Enum):
     ABSOLUTE = 1
 
 
+_relative_time_re = re.compile(r"(\d+(?:[.,]\d+)?)\s?(\w+)")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_relative_time(time_string: str) -> float:
+    """Parse a relative time string such as "1h 30m" into a number of seconds.
+
+    Single letters are case-sensitive, words are case-insensitive and may be misspelled by one character.
+    Returns 0 if no time could be found.
+    """
+    time = 0.0
+
+    for val, category in _relative_time_re.findall(time_string):
+        # Replace commas with periods to correctly register decimal places
+        val = float(val.replace(",", "."))
+
+        if len(category) == 1:
+            time += time_letter_dict.get(category, 0) * val
+        else:
+            time += time_word_variants.get(category.lower(), 0) * val
+
+    return time
+
+
+@cache(maxsize=4096, strategy=Strategy.redis, ttl=3600)
+async def get_user_timezone(user_id: int) -> str:
+    """Get the timezone a user has set with `/timezone set`, cached in-process and shared through Redis.
+
+    Must be invalidated with ``get_user_timezone.invalidate(user_id)`` whenever the timezone changes.
+    """
+    model = await UserModel.filter(id=user_id).first()
+    return model.tz if model and model.tz else "UTC"
+
+
 class Scheduler:
     """
     All timer-related functionality, including time conversion from strings,
@@ -43,19 +94,64 @@ class Scheduler:
     Essentially the internal scheduler of the bot.
     """
 
-    compiled = re.compile(r"(\d+(?:[.,]\d+)?)\s?(\w+)")
-
-    def __init__(self, bot: Airy) -> None:
+    compiled = _relative_time_re
+
+    def __init__(self,
+                 bot: Airy,
+                 *,
+                 window: datetime.timedelta = datetime.timedelta(hours=1),
+                 window_size: int = 1000,
+                 catch_up_page_size: int = 500,
+                 catch_up_concurrency: int = 8,
+                 catch_up_rate: float = 20.0,
+                 short_timer_threshold: float = 120.0,
+                 journal: t.Optional[TimerJournal] = None,
+                 backend: t.Optional[TimerBackend] = None,
+                 absolute_cache_size: int = 512,
+                 absolute_cache_bucket: float = 30.0,
+                 ) -> None:
         self.bot: Airy = bot
-        self._current_timer: t.Optional[TimerModel] = None  # Currently, active timer that is being awaited
+        self._backend: TimerBackend = backend or PostgresTimerBackend()
+        self._current_timer: t.Optional[BaseTimerEvent] = None  # Currently, active timer that is being awaited
         self._dispatching_task: t.Optional[asyncio.Task] = None  # Current task that is handling current_timer
         self._timer_loop: IntervalLoop = IntervalLoop(self._wait_for_active_timers, hours=1.0)
 
+        self.window: datetime.timedelta = window  # How far ahead timers are loaded into memory
+        self.window_size: int = window_size  # Maximum amount of timers loaded per refill
+        self._heap: t.List[t.Tuple[datetime.datetime, int]] = []  # (expires, id) min-heap of the loaded window
+        self._queued: t.Dict[int, BaseTimerEvent] = {}  # Timers in the window, stale heap entries are skipped
+        self._window_end: t.Optional[datetime.datetime] = None  # Every timer expiring before this is in the heap
+        self._wakeup: asyncio.Event = asyncio.Event()
+
+        self.catch_up_page_size: int = catch_up_page_size  # Overdue timers fetched and deleted per query
+        self.catch_up_concurrency: int = catch_up_concurrency  # Overdue timers being dispatched at once
+        self.catch_up_rate: float = catch_up_rate  # Maximum overdue timers dispatched per second
+
+        # Timers expiring within this many seconds never touch the database and live in the wheel instead
+        self.short_timer_threshold: float = short_timer_threshold
+        self._wheel: TimingWheel = TimingWheel(self._dispatch_short_timer, journal=journal)
+
+        # Parsed absolute times, keyed by (normalized string, timezone, "now" bucket)
+        self._absolute_cache: LRU = LRU(absolute_cache_size)
+        self.absolute_cache_bucket: float = absolute_cache_bucket  # Seconds during which "now" is considered equal
+
     @property
-    def current_timer(self):
+    def current_timer(self) -> t.Optional[BaseTimerEvent]:
         return self._current_timer
 
+    @property
+    def backend(self) -> TimerBackend:
+        return self._backend
+
+    @property
+    def wheel(self) -> TimingWheel:
+        return self._wheel
+
     async def start(self):
+        # The first dateparser call loads all of its language data, get it out of the way
+        self.bot.create_task(self._parse_absolute("now", "UTC"))
+        await self._wheel.load()
+        self._wheel.start()
         self._timer_loop.start()
 
     async def restart(self) -> None:
@@ -66,6 +162,7 @@ class Scheduler:
             self._dispatching_task.cancel()
         self._dispatching_task = None
         self._current_timer = None
+        self._clear_window()
         self._timer_loop.cancel()
         self._timer_loop.start()
         logger.info("The scheduler was restarted.")
@@ -89,7 +186,7 @@ class Scheduler:
         Parameters
         ----------
         days : int, optional
-            The maximum expiry of the timer, by default 5
+            The maximum expiry of the timer, by default 7
 
         Returns
         -------
@@ -97,9 +194,69 @@ class Scheduler:
             The timer object that was found, if any.
         """
         await self.bot.wait_until_started()
-        model = await TimerModel.filter(expires__lt=utcnow() + datetime.timedelta(days=days)).first()
+        loaded = await self._backend.fetch_window(utcnow() + datetime.timedelta(days=days), 1)
+
+        if not loaded:
+            return
+
+        timer = loaded[0]
+        timer.app = self.bot
+        return timer
+
+    def _clear_window(self) -> None:
+        self._heap.clear()
+        self._queued.clear()
+        self._window_end = None
+
+    def _push_timer(self, timer: BaseTimerEvent) -> None:
+        """Put a timer into the in-memory window, waking up the dispatcher if it became the earliest one."""
+        self._ensure_dispatching()
+        self._queued[timer.id] = timer
+        heapq.heappush(self._heap, (timer.expires, timer.id))
+
+        if self._heap[0][1] == timer.id:
+            self._wakeup.set()
+
+    def _ensure_dispatching(self) -> None:
+        """Start the dispatching task if it is not running, e.g. after it died."""
+        if self._dispatching_task is None or self._dispatching_task.done():
+            self._clear_window()
+            self._dispatching_task = asyncio.create_task(self._dispatch_timers())
+
+    def _peek_timer(self) -> t.Optional[BaseTimerEvent]:
+        """Return the earliest timer of the window, dropping stale heap entries on the way."""
+        while self._heap:
+            expires, timer_id = self._heap[0]
+            timer = self._queued.get(timer_id)
 
-        return self.prepare_timer(model)
+            if timer is not None and timer.expires == expires:
+                return timer
+
+            heapq.heappop(self._heap)
+
+        return None
+
+    async def _refill_window(self) -> None:
+        """Load every timer expiring within the next window into the heap."""
+        window = self.window
+
+        if self._backend.refill_interval is not None:
+            window = min(window, self._backend.refill_interval)
+
+        window_end = utcnow() + window
+        loaded = await self._backend.fetch_window(window_end, self.window_size)
+
+        if len(loaded) == self.window_size:
+            # The window is full, only trust it up to the last loaded timer
+            window_end = loaded[-1].expires
+
+        for timer in loaded:
+            if timer.id not in self._queued:
+                timer.app = self.bot
+                self._push_timer(timer)
+
+        self._window_end = window_end
+        logger.debug(f"Loaded {len(loaded)} timers expiring before {window_end}")
 
     async def _call_timer(self, timer: BaseTimerEvent) -> None:
         """Calls the provided timer, dispatches TimerCompleteEvent, and removes the timer object from
@@ -111,54 +268,164 @@ class Scheduler:
             The timer to be called.
         """
 
-        await TimerModel.filter(id=timer.id).delete()
+        if isinstance(timer, RecurringTimerEvent):
+            # Recurring timers are claimed by moving them to their next expiry, the row is kept
+            next_expires = timer.next_expires(utcnow())
+            claimed = await self._backend.reschedule(timer, next_expires)
+        else:
+            next_expires = None
+            claimed = await self._backend.claim(timer)
+
         self._current_timer = None
 
+        if not claimed:
+            # The timer was cancelled in the meantime
+            return
+
         await self.bot.dispatch(timer)
-        logger.info(f"Dispatched {timer.__name__} (ID: {timer.id})")
 
-    async def short_timer_optimisation(self, seconds: t.Union[int, float], timer: BaseTimerEvent):
-        await asyncio.sleep(seconds)
+        if next_expires is not None:
+            if self._window_end is not None and next_expires < self._window_end:
+                self._push_timer(attr.evolve(timer, expires=next_expires))
+        else:
+            await self._backend.complete(timer)
+
+        logger.info(f"Dispatched {timer.event} (ID: {timer.id})")
+
+    async def _catch_up(self) -> int:
+        """Drain every overdue timer, e.g. the ones that expired while the bot was offline.
+
+        Overdue timers are claimed in pages and dispatched by a bounded pool of workers,
+        paced to at most ``catch_up_rate`` timers per second.
+
+        Returns
+        -------
+        int
+            The amount of timers that were dispatched.
+        """
+        queue: asyncio.Queue[BaseTimerEvent] = asyncio.Queue(maxsize=self.catch_up_page_size)
+        interval = 1 / self.catch_up_rate if self.catch_up_rate > 0 else 0
+        next_slot = 0.0
+        dispatched = 0
+
+        async def worker() -> None:
+            nonlocal next_slot, dispatched
+            loop = asyncio.get_running_loop()
+
+            while True:
+                timer = await queue.get()
+                try:
+                    now = loop.time()
+                    slot = max(now, next_slot)
+                    next_slot = slot + interval
+                    await asyncio.sleep(slot - now)
+
+                    await self.bot.dispatch(timer)
+                    dispatched += 1
+                except Exception as e:
+                    logger.error(f"Failed to dispatch overdue timer {timer.event} (ID: {timer.id}): {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, self.catch_up_concurrency))]
+        fetched = 0
+
+        try:
+            while True:
+                claimed = await self._backend.claim_due(utcnow(), self.catch_up_page_size)
+                if not claimed:
+                    break
+
+                fetched += len(claimed)
+
+                if fetched == len(claimed):
+                    logger.info("Catching up on overdue timers...")
+
+                for timer in claimed:
+                    timer.app = self.bot
+                    await queue.put(timer)
+
+                await queue.join()
+                # Recurring timers were already moved to their next expiry by the claim
+                await self._backend.complete(*[timer for timer in claimed
+                                               if not isinstance(timer, RecurringTimerEvent)])
+                logger.info(f"Catch-up: fetched {fetched} overdue timers, dispatched {dispatched} so far")
+
+                if len(claimed) < self.catch_up_page_size:
+                    break
+        finally:
+            for task in workers:
+                task.cancel()
+
+        if fetched:
+            logger.info(f"Caught up on {fetched} overdue timers, dispatched {dispatched}")
+
+        return dispatched
+
+    async def _dispatch_short_timer(self, timer: BaseTimerEvent) -> None:
+        timer.app = self.bot
         await self.bot.dispatch(timer)
+        logger.info(f"Dispatched short timer {timer.event}")
 
     async def _dispatch_timers(self):
         """
         A task that loops, waits for, and calls pending timers.
         """
-        try:
-            while self.bot.is_ready:
-                timer = await self.get_latest_timer(days=30)
-                self._current_timer = timer
+        await self.bot.wait_until_started()
 
-                now = utcnow()
+        caught_up = False
+        backoff = 1.0
 
-                if not timer:
-                    break
+        while self.bot.is_ready:
+            try:
+                if not caught_up:
+                    await self._catch_up()
+                    caught_up = True
 
-                if timer.expires >= now:
-                    sleep_time = (timer.expires - now).total_seconds()
-                    logger.info(f"Awaiting next timer: '{timer.event}' (ID: {timer.id}), which is in {sleep_time}s")
-                    await asyncio.sleep(sleep_time)
+                now = utcnow()
 
-                # TODO: Maybe some sort of queue system so we do not spam out timers like crazy after restart?
-                logger.info(f"Dispatching timer: {timer.event} (ID: {timer.id})")
-                await self._call_timer(timer)
+                if self._window_end is None or self._window_end <= now:
+                    await self._refill_window()
 
-        except asyncio.CancelledError:
-            raise
-        except (OSError, hikari.GatewayServerClosedConnectionError):
-            if self._dispatching_task:
-                self._dispatching_task.cancel()
-            self._dispatching_task = asyncio.create_task(self._dispatch_timers())
+                timer = self._peek_timer()
+                self._current_timer = timer
+                wake_at = self._window_end
+
+                if timer is not None:
+                    if timer.expires <= now:
+                        heapq.heappop(self._heap)
+                        del self._queued[timer.id]
+                        logger.info(f"Dispatching timer: {timer.event} (ID: {timer.id})")
+                        await self._call_timer(timer)
+                        continue
+
+                    wake_at = min(timer.expires, wake_at)
+                    logger.info(f"Awaiting next timer: '{timer.event}' (ID: {timer.id}), "
+                                f"which is in {(timer.expires - now).total_seconds()}s")
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=(wake_at - now).total_seconds())
+                except asyncio.TimeoutError:
+                    pass
+
+                backoff = 1.0
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A failing database or gateway must not end dispatching for good
+                logger.error(f"Timer dispatching failed, retrying in {backoff:.0f}s: {e}", exc_info=e)
+                self._clear_window()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
 
     async def _wait_for_active_timers(self) -> None:
         """
-        Check every hour to see if new timers meet criteria in the database.
+        Check every hour that the dispatching task is alive.
         """
         await self.bot.wait_until_started()
-
-        if self._dispatching_task is None:
-            self._current_task = asyncio.create_task(self._dispatch_timers())
+        self._ensure_dispatching()
 
     async def create_timer(self, cls: t.Type[BaseTimerEventT],
                            expires: datetime.datetime,
@@ -185,30 +452,67 @@ class Scheduler:
         timer = cls(expires=expires, created=now, args=args, kwargs=kwargs)
         delta = (expires - now).total_seconds()
 
-        if delta <= 120:
-            # a shortcut for small scheduler
-            self.bot.create_task(self.short_timer_optimisation(delta, timer))
+        if delta <= self.short_timer_threshold and not issubclass(cls, RecurringTimerEvent):
+            # Short timers are not worth a database round-trip
+            await self._wheel.add(timer)
             return timer
 
-        model = await TimerModel.create(event=timer.event,
-                                        expires=expires,
-                                        now=now,
-                                        extra={'args': args, 'kwargs': kwargs})
+        timer.id = await self._backend.create(timer)
+        timer.app = self.bot
+        self._ensure_dispatching()
 
-        timer.id = model.id
+        # Timers past the window are picked up by the next refill
+        if self._window_end is not None and timer.expires < self._window_end:
+            self._push_timer(timer)
 
-        # If there is already a timer in queue, and it has an expiry that is further than the timer we just created
-        # then we restart the dispatch_timers() to re-check for the latest timer.
-        if self._current_timer and timer.expires < self._current_timer.expires:
-            logger.debug("Reshuffled timers, created timer is now the latest timer.")
-            if self._dispatching_task:
-                self._dispatching_task.cancel()
-            self._dispatching_task = asyncio.create_task(self._dispatch_timers())
+        return timer
 
-        elif self._current_timer is None:
-            self._dispatching_task = asyncio.create_task(self._dispatch_timers())
+    async def create_timers(self,
+                            entries: t.Iterable[t.Tuple[t.Type[BaseTimerEventT],
+                                                        datetime.datetime,
+                                                        t.Sequence[t.Any],
+                                                        t.Dict[str, t.Any]]],
+                            ) -> t.List[BaseTimerEvent]:
+        """Create and schedule many timers at once.
 
-        return timer
+        Timers are stored with a single multi-row insert, and the dispatcher is reshuffled at most once.
+
+        Parameters
+        ----------
+        entries : Iterable[Tuple[Type[BaseTimerEventT], datetime.datetime, Sequence[Any], Dict[str, Any]]]
+            The (cls, expires, args, kwargs) of every timer to create, as they would be passed to create_timer.
+
+        Returns
+        -------
+        List[Timer]
+            The timer objects that got created, in the same order.
+        """
+        now = utcnow()
+        created = []
+        stored = []
+
+        for cls, expires, args, kwargs in entries:
+            expires = expires.astimezone(datetime.timezone.utc)
+            timer = cls(expires=expires, created=now, args=tuple(args), kwargs=dict(kwargs))
+            created.append(timer)
+
+            if (expires - now).total_seconds() <= self.short_timer_threshold \
+                    and not isinstance(timer, RecurringTimerEvent):
+                await self._wheel.add(timer)
+            else:
+                stored.append(timer)
+
+        if stored:
+            self._ensure_dispatching()
+
+        for timer, timer_id in zip(stored, await self._backend.create_many(stored)):
+            timer.id = timer_id
+            timer.app = self.bot
+
+            if self._window_end is not None and timer.expires < self._window_end:
+                self._push_timer(timer)
+
+        return created
 
     async def update_timer(self, timer: BaseTimerEvent) -> None:
         """Update a currently running timer, replacing it with the specified timer object.
@@ -219,15 +523,12 @@ class Scheduler:
         timer : Timer
             The timer object to update.
         """
-        await TimerModel.filter(id=timer.id).update(args=timer.args,
-                                                    kwargs=timer.kwargs,
-                                                    expires=timer.expires)
-
-        if self._current_timer and timer.expires < self._current_timer.expires:
-            logger.debug("Reshuffled timers, created timer is now the latest timer.")
-            if self._dispatching_task:
-                self._dispatching_task.cancel()
-            self._dispatching_task = asyncio.create_task(self._dispatch_timers())
+        await self._backend.update(timer)
+
+        # The old heap entry no longer matches the timer's expiry and is skipped lazily
+        self._queued.pop(timer.id, None)
+        if self._window_end is not None and timer.expires < self._window_end:
+            self._push_timer(timer)
 
     async def get_timer(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
         """Retrieve a currently pending timer.
@@ -243,14 +544,14 @@ class Scheduler:
             The located timer object.
         """
 
-        model = await TimerModel.filter(id=timer_id).first()
+        timer = await self._backend.get(timer_id)
 
-        if model is None:
-            return
+        if timer is not None:
+            timer.app = self.bot
 
-        return self.prepare_timer(model)
+        return timer
 
-    async def cancel_timer(self, timer_id: int) -> t.Optional[TimerModel]:
+    async def cancel_timer(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
         """Prematurely cancel a timer before expiry. Returns the cancelled timer.
 
         Parameters
@@ -263,24 +564,86 @@ class Scheduler:
         Timer
             The cancelled timer object.
         """
-        model = await TimerModel.filter(id=timer_id).first()
+        timer = await self._backend.delete(timer_id)
 
-        if model is None:
+        if timer is None:
             return
 
-        await model.delete()
+        self._queued.pop(timer.id, None)
+        timer.app = self.bot
+        return timer
+
+    async def get_owned_timers(self,
+                               event: str,
+                               owner_id: int,
+                               *,
+                               limit: int = 10,
+                               after: t.Optional[t.Tuple[datetime.datetime, int]] = None,
+                               ) -> t.List[BaseTimerEvent]:
+        """Retrieve pending timers of a user, soonest first.
 
-        cls = timers.get(model.event)
+        Parameters
+        ----------
+        event : str
+            The event of the timers, e.g. 'reminder'.
+        owner_id : int
+            The ID of the user that created the timers.
+        limit : int, optional
+            The maximum amount of timers returned, by default 10
+        after : t.Optional[t.Tuple[datetime.datetime, int]], optional
+            The (expires, id) of the last timer of the previous page, by default None
 
-        if cls is None:
-            return
+        Returns
+        -------
+        List[Timer]
+            The located timer objects.
+        """
+        loaded = await self._backend.fetch_owned(event, owner_id, limit, after)
 
-        return cls(id=model.id,
-                   app=self.bot,
-                   expires=model.expires,
-                   created=model.created,
-                   args=model.extra.get("args"),
-                   kwargs=model.extra.get("kwargs"))
+        for timer in loaded:
+            timer.app = self.bot
+
+        return loaded
+
+    async def count_owned_timers(self, event: str, owner_id: int) -> int:
+        """Count the pending timers of a user."""
+        return await self._backend.count_owned(event, owner_id)
+
+    async def cancel_owned_timers(self, event: str, owner_id: int) -> int:
+        """Cancel every pending timer of a user. Returns the amount of cancelled timers."""
+        deleted = await self._backend.delete_owned(event, owner_id)
+
+        for timer_id in deleted:
+            self._queued.pop(timer_id, None)
+
+        return len(deleted)
+
+    async def cancel_targeted_timers(self, event: str, guild_id: int, target_id: int) -> int:
+        """Cancel every pending timer acting upon a member of a guild. Returns the amount of cancelled timers."""
+        deleted = await self._backend.delete_targeted(event, guild_id, target_id)
+
+        for timer_id in deleted:
+            self._queued.pop(timer_id, None)
+
+        return len(deleted)
+
+    async def _parse_absolute(self, time_string: str, timezone: str) -> t.Optional[datetime.datetime]:
+        """Parse an absolute time with dateparser in a thread, memoizing the result."""
+        normalized = " ".join(time_string.lower().split())
+        key = (normalized, timezone, int(_time.time() // self.absolute_cache_bucket))
+
+        try:
+            return self._absolute_cache[key]
+        except KeyError:
+            pass
+
+        time = await asyncio.to_thread(
+            dateparser.parse,
+            normalized,
+            settings={"RETURN_AS_TIMEZONE_AWARE": True, "TIMEZONE": timezone, "NORMALIZE": True}
+        )
+        self._absolute_cache[key] = time
+        return time
 
     async def convert_time(
             self,
@@ -321,27 +684,7 @@ class Scheduler:
         logger.debug(f"String passed for time conversion: {time_string}")
 
         if conversion_mode == ConversionMode.RELATIVE:
-            matches = self.compiled.findall(time_string)
-            time = 0
-
-            for val, category in matches:
-                val = val.replace(",", ".")  # Replace commas with periods to correctly register decimal places
-                # If this is a single letter
-
-                if len(category) == 1:
-                    if category in time_letter_dict.keys():
-                        time += time_letter_dict[category] * float(val)
-                        break
-
-                else:
-                    # If a partial match is found with any of the keys
-                    # Reason for making the same code here is because words are case-insensitive,
-                    # as opposed to single letters
-
-                    for string in time_word_dict.keys():
-                        if lev.distance(category.lower(), string.lower()) <= 1:
-                            time += time_word_dict[string] * float(val)
-                            break
+            time = parse_relative_time(time_string)
 
             if time > 0:  # If we found time
                 return utcnow() + datetime.timedelta(seconds=time)
@@ -350,16 +693,8 @@ class Scheduler:
 
         if conversion_mode == ConversionMode.ABSOLUTE:
 
-            timezone = "UTC"
-            if user_id:
-                model = await UserModel.filter(user_id=user_id).first()
-                if model:
-                    timezone = model.tz
-                    assert timezone is not None
-
-            time = dateparser.parse(
-                time_string, settings={"RETURN_AS_TIMEZONE_AWARE": True, "TIMEZONE": timezone, "NORMALIZE": True}
-            )
+            timezone = await get_user_timezone(int(user_id)) if user_id else "UTC"
+            time = await self._parse_absolute(time_string, timezone)
 
             if not time:
                 raise ValueError("Time could not be parsed. (absolute)")
@@ -0,0 +1,552 @@
+from __future__ import annotations
+
+import abc
+import datetime
+import json
+import os
+import socket
+import typing as t
+
+import orjson
+from tortoise import Tortoise
+from tortoise.expressions import Q
+
+from airy.core.models import TimerModel
+from airy.utils import utcnow
+from .timers import BaseTimerEvent, RecurringTimerEvent, timers, dump_timer, load_timer
+
+if t.TYPE_CHECKING:
+    import aioredis
+
+
+__all__ = ("TimerBackend",
+           "PostgresTimerBackend",
+           "LeasedPostgresTimerBackend",
+           "RedisTimerBackend",
+           )
+
+
+class TimerBackend(abc.ABC):
+    """Storage of the timers handled by the :class:`Scheduler`."""
+
+    # If set, the scheduler reloads its window at least this often, to see changes made outside of it
+    refill_interval: t.Optional[datetime.timedelta] = None
+
+    @abc.abstractmethod
+    async def create(self, timer: BaseTimerEvent) -> int:
+        """Store a new timer and return its ID."""
+
+    async def create_many(self, timers_: t.Sequence[BaseTimerEvent]) -> t.List[int]:
+        """Store several new timers at once and return their IDs, in the same order."""
+        return [await self.create(timer) for timer in timers_]
+
+    @abc.abstractmethod
+    async def update(self, timer: BaseTimerEvent) -> None:
+        """Replace the stored expiry and arguments of a timer."""
+
+    @abc.abstractmethod
+    async def get(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
+        """Return the timer with the given ID, if it is still pending."""
+
+    @abc.abstractmethod
+    async def delete(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
+        """Remove the timer with the given ID and return it, if it was still pending."""
+
+    @abc.abstractmethod
+    async def fetch_window(self, until: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        """Return up to `limit` timers expiring before `until`, earliest first."""
+
+    @abc.abstractmethod
+    async def claim(self, timer: BaseTimerEvent) -> bool:
+        """Atomically take a timer out of the storage before dispatching it.
+
+        Returns False if the timer was cancelled or claimed by someone else in the meantime.
+        """
+
+    @abc.abstractmethod
+    async def claim_due(self, now: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        """Atomically claim up to `limit` timers that expired before `now`, earliest first.
+
+        Other timers are taken out of the storage, recurring ones are moved to their next expiry in place.
+        Timers whose event is not registered are left untouched.
+        """
+
+    async def complete(self, *timers_: BaseTimerEvent) -> None:
+        """Called once claimed timers were dispatched."""
+
+    async def _reschedule_due(self, loaded: t.List[BaseTimerEvent], now: datetime.datetime) -> t.List[BaseTimerEvent]:
+        """Claim the recurring timers of `loaded` by moving them past `now`, dropping the ones moved by someone else."""
+        claimed = []
+
+        for timer in loaded:
+            if isinstance(timer, RecurringTimerEvent) and not await self.reschedule(timer, timer.next_expires(now)):
+                continue
+            claimed.append(timer)
+
+        return claimed
+
+    @abc.abstractmethod
+    async def reschedule(self, timer: BaseTimerEvent, expires: datetime.datetime) -> bool:
+        """Atomically move a pending timer from its current expiry to `expires`.
+
+        Used to claim recurring timers. Returns False if the timer is gone or was already moved by someone else.
+        """
+
+    @abc.abstractmethod
+    async def fetch_owned(self,
+                          event: str,
+                          owner_id: int,
+                          limit: int,
+                          after: t.Optional[t.Tuple[datetime.datetime, int]] = None,
+                          ) -> t.List[BaseTimerEvent]:
+        """Return up to `limit` pending timers of an owner, ordered by (expires, id) and starting past `after`."""
+
+    @abc.abstractmethod
+    async def count_owned(self, event: str, owner_id: int) -> int:
+        """Return how many timers of an owner are pending."""
+
+    @abc.abstractmethod
+    async def delete_owned(self, event: str, owner_id: int) -> t.List[int]:
+        """Remove every pending timer of an owner and return their IDs."""
+
+    @abc.abstractmethod
+    async def delete_targeted(self, event: str, guild_id: int, target_id: int) -> t.List[int]:
+        """Remove every pending timer acting upon a member of a guild and return their IDs."""
+
+
+class PostgresTimerBackend(TimerBackend):
+    """The default backend, storing timers in the `timer` table."""
+
+    @staticmethod
+    def _to_timer(model: TimerModel) -> t.Optional[BaseTimerEvent]:
+        cls = timers.get(model.event)
+
+        if cls is None:
+            return
+
+        return cls(id=model.id,
+                   expires=model.expires,
+                   created=model.created,
+                   args=model.extra.get("args"),
+                   kwargs=model.extra.get("kwargs"))
+
+    async def create(self, timer: BaseTimerEvent) -> int:
+        model = await TimerModel.create(event=timer.event,
+                                        expires=timer.expires,
+                                        created=timer.created,
+                                        extra={'args': timer.args, 'kwargs': timer.kwargs},
+                                        owner_id=timer.owner_id,
+                                        guild_id=timer.guild_id,
+                                        target_id=timer.target_id)
+        return model.id
+
+    async def create_many(self, timers_: t.Sequence[BaseTimerEvent], chunk_size: int = 1000) -> t.List[int]:
+        connection = Tortoise.get_connection("default")
+        ids = []
+
+        # A single multi-row INSERT per chunk, staying well below the limit of query parameters
+        for start in range(0, len(timers_), chunk_size):
+            chunk = timers_[start:start + chunk_size]
+            values = []
+            placeholders = []
+
+            for index, timer in enumerate(chunk):
+                offset = index * 7
+                placeholders.append(f"(${offset + 1}, ${offset + 2}, ${offset + 3}, ${offset + 4}::jsonb, "
+                                    f"${offset + 5}, ${offset + 6}, ${offset + 7})")
+                values.extend((timer.event,
+                               timer.expires,
+                               timer.created,
+                               json.dumps({'args': list(timer.args), 'kwargs': timer.kwargs}),
+                               timer.owner_id,
+                               timer.guild_id,
+                               timer.target_id))
+
+            rows = await connection.execute_query_dict(
+                f"""
+                INSERT INTO "timer" ("event", "expires", "created", "extra", "owner_id", "guild_id", "target_id")
+                VALUES {", ".join(placeholders)}
+                RETURNING "id"
+                """,
+                values,
+            )
+            ids.extend(row["id"] for row in rows)
+
+        return ids
+
+    async def update(self, timer: BaseTimerEvent) -> None:
+        await TimerModel.filter(id=timer.id).update(extra={'args': timer.args, 'kwargs': timer.kwargs},
+                                                    expires=timer.expires,
+                                                    owner_id=timer.owner_id,
+                                                    guild_id=timer.guild_id,
+                                                    target_id=timer.target_id)
+
+    async def reschedule(self, timer: BaseTimerEvent, expires: datetime.datetime) -> bool:
+        return bool(await TimerModel.filter(id=timer.id, expires=timer.expires).update(expires=expires))
+
+    async def get(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
+        model = await TimerModel.filter(id=timer_id).first()
+
+        if model is None:
+            return
+
+        return self._to_timer(model)
+
+    async def delete(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
+        model = await TimerModel.filter(id=timer_id).first()
+
+        if model is None or not await TimerModel.filter(id=timer_id).delete():
+            return
+
+        return self._to_timer(model)
+
+    async def fetch_window(self, until: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        models = await TimerModel.filter(expires__lt=until).order_by('expires', 'id').limit(limit)
+        return [timer for model in models if (timer := self._to_timer(model)) is not None]
+
+    async def claim(self, timer: BaseTimerEvent) -> bool:
+        # A timer whose expiry changed in the meantime is left for the next refill
+        return bool(await TimerModel.filter(id=timer.id, expires=timer.expires).delete())
+
+    async def claim_due(self, now: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        # Rows of unknown events can not be dispatched, they are never selected and so never deleted
+        models = await (TimerModel
+                        .filter(expires__lte=now, event__in=list(timers))
+                        .order_by('expires', 'id')
+                        .limit(limit))
+        loaded = [timer for model in models if (timer := self._to_timer(model)) is not None]
+        once = [timer.id for timer in loaded if not isinstance(timer, RecurringTimerEvent)]
+
+        if once:
+            await TimerModel.filter(id__in=once).delete()
+
+        return await self._reschedule_due(loaded, now)
+
+    async def fetch_owned(self,
+                          event: str,
+                          owner_id: int,
+                          limit: int,
+                          after: t.Optional[t.Tuple[datetime.datetime, int]] = None,
+                          ) -> t.List[BaseTimerEvent]:
+        query = TimerModel.filter(event=event, owner_id=owner_id)
+
+        if after is not None:
+            expires, timer_id = after
+            query = query.filter(Q(expires__gt=expires) | (Q(expires=expires) & Q(id__gt=timer_id)))
+
+        models = await query.order_by('expires', 'id').limit(limit)
+        return [timer for model in models if (timer := self._to_timer(model)) is not None]
+
+    async def count_owned(self, event: str, owner_id: int) -> int:
+        return await TimerModel.filter(event=event, owner_id=owner_id).count()
+
+    @staticmethod
+    async def _delete_where(condition: str, values: t.List[t.Any]) -> t.List[int]:
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            f'DELETE FROM "timer" WHERE {condition} RETURNING "id"',
+            values,
+        )
+        return [row["id"] for row in rows]
+
+    async def delete_owned(self, event: str, owner_id: int) -> t.List[int]:
+        return await self._delete_where('"event" = $1 AND "owner_id" = $2', [event, owner_id])
+
+    async def delete_targeted(self, event: str, guild_id: int, target_id: int) -> t.List[int]:
+        return await self._delete_where('"event" = $1 AND "guild_id" = $2 AND "target_id" = $3',
+                                        [event, guild_id, target_id])
+
+
+class LeasedPostgresTimerBackend(PostgresTimerBackend):
+    """Lets several processes share the `timer` table.
+
+    Instead of deleting a timer when claiming it, a process takes a lease on the row with
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` and only deletes it once it was dispatched.
+    Leases of a process that crashed in between expire and the timer is claimed again by another process.
+    Schedulers using this backend reload their window every lease period, so they see expired leases in time.
+
+    Parameters
+    ----------
+    owner : Optional[str]
+        Identifies this process in the lease, defaults to ``hostname:pid``.
+    lease : datetime.timedelta
+        How long a claimed timer is reserved for this process.
+    """
+
+    def __init__(self,
+                 owner: t.Optional[str] = None,
+                 lease: datetime.timedelta = datetime.timedelta(minutes=5),
+                 ) -> None:
+        self.owner: str = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease: datetime.timedelta = lease
+        self.refill_interval = lease
+
+    async def _lease(self, condition: str, values: t.List[t.Any], limit: int) -> t.List[BaseTimerEvent]:
+        now = utcnow()
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            f"""
+            UPDATE "timer" SET "lease_owner" = $1, "lease_expires" = $2
+            WHERE "id" IN (
+                SELECT "id" FROM "timer"
+                WHERE ({condition}) AND ("lease_expires" IS NULL OR "lease_expires" < $3)
+                ORDER BY "expires", "id"
+                LIMIT {int(limit)}
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING "id", "event", "expires", "created", "extra"
+            """,
+            [self.owner, now + self.lease, now, *values],
+        )
+
+        models = [TimerModel._init_from_db(**row) for row in rows]
+        models.sort(key=lambda model: (model.expires, model.id))
+        return [timer for model in models if (timer := self._to_timer(model)) is not None]
+
+    async def fetch_window(self, until: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        models = await (TimerModel
+                        .filter(Q(expires__lt=until) & (Q(lease_expires__isnull=True) | Q(lease_expires__lt=utcnow())))
+                        .order_by('expires', 'id')
+                        .limit(limit))
+        return [timer for model in models if (timer := self._to_timer(model)) is not None]
+
+    async def claim(self, timer: BaseTimerEvent) -> bool:
+        return bool(await self._lease('"id" = $4 AND "expires" = $5', [timer.id, timer.expires], 1))
+
+    async def claim_due(self, now: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        leased = await self._lease('"expires" <= $4 AND "event" = ANY($5)', [now, list(timers)], limit)
+        # Rescheduling also releases the lease of recurring timers
+        return await self._reschedule_due(leased, now)
+
+    async def complete(self, *timers_: BaseTimerEvent) -> None:
+        await TimerModel.filter(id__in=[timer.id for timer in timers_], lease_owner=self.owner).delete()
+
+    async def reschedule(self, timer: BaseTimerEvent, expires: datetime.datetime) -> bool:
+        return bool(await (TimerModel
+                           .filter(id=timer.id, expires=timer.expires)
+                           .update(expires=expires, lease_owner=None, lease_expires=None)))
+
+
+# Removes a single timer, returning its payload only if it was still pending.
+_CLAIM_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+local payload = redis.call('HGET', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return payload
+"""
+
+# Moves a timer to a new score and payload, only if it still has the expected score.
+_RESCHEDULE_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score or tonumber(score) ~= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[4])
+return 1
+"""
+
+# Returns the payloads of up to ARGV[2] timers that expired before ARGV[1], earliest first.
+# ARGV[3] maps the registered events to "once" or "recurring": timers of other events are left in place,
+# "once" timers are removed and recurring ones are kept, to be moved to their next expiry by the caller.
+_CLAIM_DUE_SCRIPT = """
+local kinds = cjson.decode(ARGV[3])
+local limit = tonumber(ARGV[2])
+local payloads = {}
+local offset = 0
+while #payloads < limit do
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', offset, limit)
+    if #ids == 0 then
+        break
+    end
+    for _, id in ipairs(ids) do
+        local payload = redis.call('HGET', KEYS[2], id)
+        local kind = payload and kinds[cjson.decode(payload)['event']]
+        if not payload or kind == 'once' then
+            redis.call('ZREM', KEYS[1], id)
+            redis.call('HDEL', KEYS[2], id)
+        else
+            offset = offset + 1
+        end
+        if kind then
+            table.insert(payloads, payload)
+            if #payloads >= limit then
+                break
+            end
+        end
+    end
+end
+return payloads
+"""
+
+# Removes every timer listed in the index KEYS[3] and the index itself, returning the IDs that were still pending.
+_DELETE_INDEXED_SCRIPT = """
+local ids = redis.call('SMEMBERS', KEYS[3])
+local deleted = {}
+for _, id in ipairs(ids) do
+    if redis.call('ZREM', KEYS[1], id) == 1 then
+        redis.call('HDEL', KEYS[2], id)
+        table.insert(deleted, id)
+    end
+end
+redis.call('DEL', KEYS[3])
+return deleted
+"""
+
+
+class RedisTimerBackend(TimerBackend):
+    """Stores timers in a Redis sorted set scored by expiry, with their payloads in a hash.
+
+    Due timers are claimed with Lua scripts, so a timer is only ever taken by a single caller.
+    Timers are also indexed by owner and by guild and target in sets, whose IDs of timers that
+    are gone are pruned when the set is read.
+
+    Parameters
+    ----------
+    redis : aioredis.Redis
+        The redis connection to use.
+    prefix : str
+        The prefix of every key used by this backend.
+    """
+
+    def __init__(self, redis: aioredis.Redis, prefix: str = "airy:timers") -> None:
+        self.redis = redis
+        self.prefix = prefix
+        self.due_key = f"{prefix}:due"
+        self.payload_key = f"{prefix}:payload"
+        self.id_key = f"{prefix}:id"
+
+        self._claim = redis.register_script(_CLAIM_SCRIPT)
+        self._claim_due = redis.register_script(_CLAIM_DUE_SCRIPT)
+        self._reschedule = redis.register_script(_RESCHEDULE_SCRIPT)
+        self._delete_indexed = redis.register_script(_DELETE_INDEXED_SCRIPT)
+
+    def _owner_key(self, event: str, owner_id: int) -> str:
+        return f"{self.prefix}:owner:{event}:{owner_id}"
+
+    def _target_key(self, event: str, guild_id: int, target_id: int) -> str:
+        return f"{self.prefix}:target:{event}:{guild_id}:{target_id}"
+
+    def _index(self, pipe: aioredis.client.Pipeline, timer: BaseTimerEvent) -> None:
+        if timer.owner_id is not None:
+            pipe.sadd(self._owner_key(timer.event, timer.owner_id), timer.id)
+        if timer.guild_id is not None and timer.target_id is not None:
+            pipe.sadd(self._target_key(timer.event, timer.guild_id, timer.target_id), timer.id)
+
+    async def _fetch_indexed(self, key: str) -> t.List[BaseTimerEvent]:
+        """Return every pending timer of an index, ordered by (expires, id), and prune the ones that are gone."""
+        ids = list(await self.redis.smembers(key))
+
+        if not ids:
+            return []
+
+        payloads = await self.redis.hmget(self.payload_key, ids)
+        gone = [timer_id for timer_id, payload in zip(ids, payloads) if payload is None]
+
+        if gone:
+            await self.redis.srem(key, *gone)
+
+        loaded = [timer for payload in payloads if (timer := self._to_timer(payload)) is not None]
+        loaded.sort(key=lambda timer: (timer.expires, timer.id))
+        return loaded
+
+    @staticmethod
+    def _to_timer(payload: t.Optional[t.Union[bytes, str]]) -> t.Optional[BaseTimerEvent]:
+        if payload is None:
+            return
+
+        return load_timer(orjson.loads(payload))
+
+    async def create(self, timer: BaseTimerEvent) -> int:
+        timer_id = await self.redis.incr(self.id_key)
+        timer.id = timer_id
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.payload_key, timer_id, orjson.dumps(dump_timer(timer)))
+            pipe.zadd(self.due_key, {timer_id: timer.expires.timestamp()})
+            self._index(pipe, timer)
+            await pipe.execute()
+
+        return timer_id
+
+    async def create_many(self, timers_: t.Sequence[BaseTimerEvent]) -> t.List[int]:
+        if not timers_:
+            return []
+
+        last_id = await self.redis.incrby(self.id_key, len(timers_))
+        ids = list(range(last_id - len(timers_) + 1, last_id + 1))
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for timer_id, timer in zip(ids, timers_):
+                timer.id = timer_id
+                pipe.hset(self.payload_key, timer_id, orjson.dumps(dump_timer(timer)))
+                self._index(pipe, timer)
+            pipe.zadd(self.due_key, {timer.id: timer.expires.timestamp() for timer in timers_})
+            await pipe.execute()
+
+        return ids
+
+    async def update(self, timer: BaseTimerEvent) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.payload_key, timer.id, orjson.dumps(dump_timer(timer)))
+            pipe.zadd(self.due_key, {timer.id: timer.expires.timestamp()}, xx=True)
+            self._index(pipe, timer)
+            await pipe.execute()
+
+    async def reschedule(self, timer: BaseTimerEvent, expires: datetime.datetime) -> bool:
+        payload = dump_timer(timer)
+        payload["expires"] = expires.timestamp()
+
+        return bool(await self._reschedule(keys=[self.due_key, self.payload_key],
+                                           args=[timer.id, timer.expires.timestamp(), expires.timestamp(),
+                                                 orjson.dumps(payload)]))
+
+    async def get(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
+        return self._to_timer(await self.redis.hget(self.payload_key, timer_id))
+
+    async def delete(self, timer_id: int) -> t.Optional[BaseTimerEvent]:
+        return self._to_timer(await self._claim(keys=[self.due_key, self.payload_key], args=[timer_id]))
+
+    async def fetch_window(self, until: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        ids = await self.redis.zrangebyscore(self.due_key, "-inf", f"({until.timestamp()}", start=0, num=limit)
+
+        if not ids:
+            return []
+
+        payloads = await self.redis.hmget(self.payload_key, ids)
+        return [timer for payload in payloads if (timer := self._to_timer(payload)) is not None]
+
+    async def claim(self, timer: BaseTimerEvent) -> bool:
+        return await self._claim(keys=[self.due_key, self.payload_key], args=[timer.id]) is not None
+
+    async def claim_due(self, now: datetime.datetime, limit: int) -> t.List[BaseTimerEvent]:
+        kinds = {event: "recurring" if issubclass(cls, RecurringTimerEvent) else "once" for event, cls in timers.items()}
+        payloads = await self._claim_due(keys=[self.due_key, self.payload_key],
+                                         args=[now.timestamp(), limit, orjson.dumps(kinds)])
+        loaded = [timer for payload in payloads if (timer := self._to_timer(payload)) is not None]
+        return await self._reschedule_due(loaded, now)
+
+    async def fetch_owned(self,
+                          event: str,
+                          owner_id: int,
+                          limit: int,
+                          after: t.Optional[t.Tuple[datetime.datetime, int]] = None,
+                          ) -> t.List[BaseTimerEvent]:
+        loaded = await self._fetch_indexed(self._owner_key(event, owner_id))
+
+        if after is not None:
+            loaded = [timer for timer in loaded if (timer.expires, timer.id) > after]
+
+        return loaded[:limit]
+
+    async def count_owned(self, event: str, owner_id: int) -> int:
+        return len(await self._fetch_indexed(self._owner_key(event, owner_id)))
+
+    async def delete_owned(self, event: str, owner_id: int) -> t.List[int]:
+        deleted = await self._delete_indexed(keys=[self.due_key, self.payload_key, self._owner_key(event, owner_id)])
+        return [int(timer_id) for timer_id in deleted]
+
+    async def delete_targeted(self, event: str, guild_id: int, target_id: int) -> t.List[int]:
+        deleted = await self._delete_indexed(keys=[self.due_key, self.payload_key,
+                                                   self._target_key(event, guild_id, target_id)])
+        return [int(timer_id) for timer_id in deleted]
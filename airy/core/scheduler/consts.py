@@ -19,4 +19,24 @@ time_word_dict = {
     "year": 86400 * 365,
     "sec": 1,
     "min": 60,
-}
\ No newline at end of file
+}
+
+_variant_alphabet = "abcdefghijklmnopqrstuvwxyz0123456789_"
+
+
+def _one_edit_variants(word: str) -> set:
+    """Every string at a Levenshtein distance of exactly one from word, over the alphabet of `\\w` ASCII chars."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    deletes = {left + right[1:] for left, right in splits if right}
+    replaces = {left + c + right[1:] for left, right in splits if right for c in _variant_alphabet}
+    inserts = {left + c + right for left, right in splits for c in _variant_alphabet}
+    return (deletes | replaces | inserts) - {word}
+
+
+# All accepted (lowercase) spellings of time_word_dict keys, including typos.
+# Keys earlier in time_word_dict take precedence, as they did with the distance scan.
+time_word_variants = {}
+for _word, _seconds in time_word_dict.items():
+    time_word_variants.setdefault(_word, _seconds)
+    for _variant in _one_edit_variants(_word):
+        time_word_variants.setdefault(_variant, _seconds)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import datetime
+import functools
+import typing as t
+
+__all__ = ("CronSpec",)
+
+
+def _parse_field(field: str, minimum: int, maximum: int) -> t.FrozenSet[int]:
+    values = set()
+
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_ = part.split("/", 1)
+            step = int(step_)
+            if step < 1:
+                raise ValueError(f"Invalid step in cron field '{field}'")
+
+        if part == "*":
+            start, end = minimum, maximum
+        elif "-" in part:
+            start_, end_ = part.split("-", 1)
+            start, end = int(start_), int(end_)
+        else:
+            start = int(part)
+            end = maximum if step > 1 else start
+
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f"Cron field '{field}' is out of range {minimum}-{maximum}")
+
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+
+class CronSpec:
+    """A standard five field cron expression: minute, hour, day of month, month and day of week.
+
+    Fields accept ``*``, numbers, ranges (``1-5``), lists (``1,15``) and steps (``*/10``).
+    Day of week is 0-7, where both 0 and 7 are Sunday.
+    """
+
+    __slots__ = ("expression", "minutes", "hours", "days", "months", "weekdays", "_any_day", "_any_weekday")
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 fields in cron expression '{expression}'")
+
+        self.expression: str = expression
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # Cron counts weekdays from Sunday, datetime from Monday
+        self.weekdays = frozenset((day - 1) % 7 for day in _parse_field(fields[4], 0, 7))
+
+        self._any_day: bool = fields[2] == "*"
+        self._any_weekday: bool = fields[4] == "*"
+
+    def __repr__(self) -> str:
+        return f"<CronSpec '{self.expression}'>"
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def parse(cls, expression: str) -> CronSpec:
+        return cls(expression)
+
+    def _day_matches(self, date: datetime.datetime) -> bool:
+        in_days = date.day in self.days
+        in_weekdays = date.weekday() in self.weekdays
+
+        # As in cron, if both fields are restricted a day matching either of them is enough
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """Return the first time strictly after `after` that matches the expression.
+
+        Each non-matching field skips straight to the start of the next candidate month, day, hour or minute.
+        """
+        date = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = after + datetime.timedelta(days=366 * 5)
+
+        while date <= limit:
+            if date.month not in self.months:
+                year, month = (date.year + 1, 1) if date.month == 12 else (date.year, date.month + 1)
+                date = date.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+
+            if not self._day_matches(date):
+                date = date.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+
+            if date.hour not in self.hours:
+                later = [hour for hour in self.hours if hour > date.hour]
+                if later:
+                    date = date.replace(hour=min(later), minute=0)
+                else:
+                    date = date.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+
+            if date.minute not in self.minutes:
+                later = [minute for minute in self.minutes if minute > date.minute]
+                if later:
+                    date = date.replace(minute=min(later))
+                else:
+                    date = date.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+
+            return date
+
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
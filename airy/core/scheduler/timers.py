@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import abc
 import datetime
+import math
 import typing as t
 
 import attr
 import hikari
 
 from airy.utils import time, utcnow
+from .cron import CronSpec
 
 if t.TYPE_CHECKING:
     from airy.core import Airy
@@ -15,11 +17,33 @@ if t.TYPE_CHECKING:
 
 __all__ = ("BaseTimerEvent",
            "ReminderEvent",
+           "RecurringTimerEvent",
            "timers",
+           "register_timer",
            "MuteEvent",
+           "dump_timer",
+           "load_timer",
            )
 
 
+TimerClassT = t.TypeVar("TimerClassT", bound="t.Type[BaseTimerEvent]")
+
+# Event name -> timer class, the classes stored timers are loaded back as
+timers: t.Dict[str, t.Type[BaseTimerEvent]] = {}
+
+
+def register_timer(event: str) -> t.Callable[[TimerClassT], TimerClassT]:
+    """Register a timer class under the name its ``event`` property returns, so stored timers can be loaded.
+
+    Must be applied on top of ``attr.define``, which replaces the class.
+    """
+    def decorator(cls: TimerClassT) -> TimerClassT:
+        timers[event] = cls
+        return cls
+
+    return decorator
+
+
 @attr.define(kw_only=True)
 class BaseTimerEvent(hikari.Event):
     app: Airy = attr.field(default=None)
@@ -38,6 +62,21 @@ class BaseTimerEvent(hikari.Event):
     def delta(self) -> t.Union[float, int]:
         return (self.expires - utcnow()).total_seconds()
 
+    @property
+    def owner_id(self) -> t.Optional[int]:
+        """The user that created the timer, stored in an indexed column."""
+        return None
+
+    @property
+    def guild_id(self) -> t.Optional[int]:
+        """The guild the timer belongs to, stored in an indexed column."""
+        return None
+
+    @property
+    def target_id(self) -> t.Optional[int]:
+        """The user the timer acts upon, stored in an indexed column."""
+        return None
+
     @property
     @abc.abstractmethod
     def event(self) -> str:
@@ -49,6 +88,38 @@ class BaseTimerEvent(hikari.Event):
         """
 
 
+@attr.define()
+class RecurringTimerEvent(BaseTimerEvent):
+    """Base class of timers that fire repeatedly.
+
+    Create them with either an ``interval`` (in seconds) or a ``cron`` expression keyword argument.
+    After every dispatch the stored timer is moved to its next expiry instead of being deleted.
+    Subclasses must be registered with :func:`register_timer` to be loaded back from the storage.
+    """
+
+    @property
+    def interval(self) -> t.Optional[float]:
+        return self.kwargs.get("interval")
+
+    @property
+    def cron(self) -> t.Optional[CronSpec]:
+        if expression := self.kwargs.get("cron"):
+            return CronSpec.parse(expression)
+        return None
+
+    def next_expires(self, now: datetime.datetime) -> datetime.datetime:
+        """The first expiry after both the current one and `now`, skipping runs that were missed."""
+        if self.interval:
+            missed = max(0, math.floor((now - self.expires).total_seconds() / self.interval))
+            return self.expires + datetime.timedelta(seconds=self.interval * (missed + 1))
+
+        if cron := self.cron:
+            return cron.next_after(max(now, self.expires))
+
+        raise ValueError("Recurring timers need either an interval or a cron expression.")
+
+
+@register_timer('reminder')
 @attr.define()
 class ReminderEvent(BaseTimerEvent):
     @property
@@ -61,7 +132,12 @@ class ReminderEvent(BaseTimerEvent):
     def event(self):
         return 'reminder'
 
+    @property
+    def owner_id(self):
+        return self.author_id
 
+
+@register_timer('mute')
 @attr.define()
 class MuteEvent(BaseTimerEvent):
     @property
@@ -82,6 +158,14 @@ class MuteEvent(BaseTimerEvent):
             return int(self.args[2])
         return None
 
+    @property
+    def owner_id(self):
+        return self.author_id
+
+    @property
+    def target_id(self):
+        return self.muted_user_id
+
     @property
     def role_id(self):
         if self.args:
@@ -93,6 +177,23 @@ class MuteEvent(BaseTimerEvent):
         return 'mute'
 
 
-timers = {'reminder': ReminderEvent,
-          'mute': MuteEvent,
-          }
+def dump_timer(timer: BaseTimerEvent) -> dict:
+    return {"id": timer.id,
+            "event": timer.event,
+            "expires": timer.expires.timestamp(),
+            "created": timer.created.timestamp(),
+            "args": list(timer.args),
+            "kwargs": timer.kwargs}
+
+
+def load_timer(payload: dict) -> t.Optional[BaseTimerEvent]:
+    cls = timers.get(payload["event"])
+
+    if cls is None:
+        return
+
+    return cls(id=payload.get("id"),
+               expires=datetime.datetime.fromtimestamp(payload["expires"], tz=datetime.timezone.utc),
+               created=datetime.datetime.fromtimestamp(payload["created"], tz=datetime.timezone.utc),
+               args=payload["args"],
+               kwargs=payload["kwargs"])
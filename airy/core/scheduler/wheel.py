@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import logging
+import math
+import os
+import pathlib
+import typing as t
+import uuid
+
+import orjson
+
+from airy.utils import utcnow
+from .timers import BaseTimerEvent, dump_timer, load_timer
+
+if t.TYPE_CHECKING:
+    import aioredis
+
+
+__all__ = ("TimingWheel",
+           "TimerJournal",
+           "FileTimerJournal",
+           "RedisTimerJournal",
+           )
+
+logger = logging.getLogger("airy.core.Scheduler.wheel")
+
+
+class TimerJournal(abc.ABC):
+    """Durable storage of the timers pending in a :class:`TimingWheel`."""
+
+    @abc.abstractmethod
+    async def load(self) -> t.Dict[str, dict]:
+        """Return every pending timer payload, keyed by its wheel key."""
+
+    @abc.abstractmethod
+    async def append(self, key: str, payload: dict) -> None:
+        """Record a timer that was added to the wheel."""
+
+    @abc.abstractmethod
+    async def remove(self, key: str) -> bool:
+        """Record that a timer left the wheel.
+
+        Returns False if it already had, e.g. because another process sharing the journal fired it.
+        """
+
+
+class FileTimerJournal(TimerJournal):
+    """Append-only journal in a local file, one JSON record per line.
+
+    With fsync, every record is on disk before the timer is scheduled, so timers survive
+    host crashes and power losses. Without it, they only survive the process exiting.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+        The journal file, created if missing.
+    compact_after : int
+        Rewrite the file with only the pending timers once this many records are obsolete.
+    fsync : bool
+        Whether to fsync the file after every record.
+    """
+
+    def __init__(self, path: t.Union[str, pathlib.Path], compact_after: int = 1000, fsync: bool = True) -> None:
+        self.path = pathlib.Path(path)
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self._pending: t.Dict[str, dict] = {}
+        self._obsolete: int = 0
+        self._file: t.Optional[t.TextIO] = None
+
+    def _write(self, record: dict) -> None:
+        if self._file is None:
+            self._file = self.path.open("a", encoding="utf-8")
+
+        self._file.write(orjson.dumps(record).decode() + "\n")
+        self._file.flush()
+
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _compact(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as file:
+            for key, payload in self._pending.items():
+                file.write(orjson.dumps({"op": "add", "key": key, "timer": payload}).decode() + "\n")
+
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+
+        os.replace(tmp, self.path)
+        self._obsolete = 0
+
+    async def load(self) -> t.Dict[str, dict]:
+        self._pending.clear()
+
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # A torn write from a crash, the rest of the journal is still usable
+                        continue
+
+                    if record["op"] == "add":
+                        self._pending[record["key"]] = record["timer"]
+                    else:
+                        self._pending.pop(record["key"], None)
+
+        self._compact()
+        return dict(self._pending)
+
+    async def append(self, key: str, payload: dict) -> None:
+        self._pending[key] = payload
+        self._write({"op": "add", "key": key, "timer": payload})
+
+    async def remove(self, key: str) -> bool:
+        if self._pending.pop(key, None) is None:
+            return False
+
+        self._write({"op": "remove", "key": key})
+        self._obsolete += 2
+
+        if self._obsolete >= self.compact_after:
+            self._compact()
+
+        return True
+
+
+class RedisTimerJournal(TimerJournal):
+    """Journal kept in a Redis hash, shared by every process using the same key.
+
+    Every process restores every timer of the hash, but a timer is only fired by the
+    process whose removal of its field succeeds, so each one fires exactly once.
+
+    Parameters
+    ----------
+    redis : aioredis.Redis
+        The redis connection to use.
+    key : str
+        The hash holding the pending timers.
+    """
+
+    def __init__(self, redis: aioredis.Redis, key: str = "airy:scheduler:wheel") -> None:
+        self.redis = redis
+        self.key = key
+
+    async def load(self) -> t.Dict[str, dict]:
+        data = await self.redis.hgetall(self.key)
+        return {(k.decode() if isinstance(k, bytes) else k): orjson.loads(v) for k, v in data.items()}
+
+    async def append(self, key: str, payload: dict) -> None:
+        await self.redis.hset(self.key, key, orjson.dumps(payload))
+
+    async def remove(self, key: str) -> bool:
+        return bool(await self.redis.hdel(self.key, key))
+
+
+class TimingWheel:
+    """Hashed timing wheel holding short-lived timers under a single tick task.
+
+    Every timer is put into the slot of the tick it expires on, so adding and
+    removing a timer is O(1) and each tick only looks at a single slot.
+    Timers further away than one revolution simply stay in their slot until
+    their tick comes around.
+
+    Parameters
+    ----------
+    callback : Callable[[BaseTimerEvent], Awaitable[Any]]
+        Called with every timer that expires.
+    tick : float
+        The resolution of the wheel, in seconds.
+    slots : int
+        The amount of slots of the wheel.
+    journal : Optional[TimerJournal]
+        If specified, pending timers are recorded here and restored by :meth:`load`.
+    """
+
+    def __init__(self,
+                 callback: t.Callable[[BaseTimerEvent], t.Awaitable[t.Any]],
+                 *,
+                 tick: float = 1.0,
+                 slots: int = 128,
+                 journal: t.Optional[TimerJournal] = None,
+                 ) -> None:
+        self.callback = callback
+        self.tick: float = tick
+        self.journal: t.Optional[TimerJournal] = journal
+
+        self._slots: t.List[t.Dict[str, t.Tuple[int, BaseTimerEvent]]] = [{} for _ in range(slots)]
+        self._entries: t.Dict[str, int] = {}  # key -> deadline tick
+        self._origin: t.Optional[float] = None
+        self._processed: int = 0  # Last tick that was processed
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: t.Optional[asyncio.Task] = None
+        self._firing: t.Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _current_tick(self) -> int:
+        return int((asyncio.get_running_loop().time() - self._origin) // self.tick)
+
+    def start(self) -> None:
+        """Start the tick task."""
+        if self._task is not None and not self._task.done():
+            return
+
+        if self._origin is None:
+            self._origin = asyncio.get_running_loop().time()
+            self._processed = 0
+
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop the tick task, pending timers are kept."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def load(self) -> int:
+        """Restore the timers recorded in the journal. Returns the amount of restored timers."""
+        if self.journal is None:
+            return 0
+
+        restored = 0
+        for key, payload in (await self.journal.load()).items():
+            timer = load_timer(payload)
+
+            if timer is None:
+                await self.journal.remove(key)
+                continue
+
+            self._insert(key, timer)
+            restored += 1
+
+        if restored:
+            logger.info(f"Restored {restored} short timers from the journal")
+
+        return restored
+
+    def _insert(self, key: str, timer: BaseTimerEvent) -> None:
+        if self._origin is None:
+            self._origin = asyncio.get_running_loop().time()
+
+        delay = max(0.0, (timer.expires - utcnow()).total_seconds())
+        now = asyncio.get_running_loop().time()
+        deadline = max(self._processed + 1, math.ceil((now + delay - self._origin) / self.tick))
+
+        self._slots[deadline % len(self._slots)][key] = (deadline, timer)
+        self._entries[key] = deadline
+        self._wakeup.set()
+
+    async def add(self, timer: BaseTimerEvent) -> str:
+        """Schedule a timer and return the key it can be cancelled with."""
+        key = uuid.uuid4().hex
+        self._insert(key, timer)
+
+        if self.journal is not None:
+            await self.journal.append(key, dump_timer(timer))
+
+        return key
+
+    async def cancel(self, key: str) -> t.Optional[BaseTimerEvent]:
+        """Remove a timer from the wheel before it expires."""
+        deadline = self._entries.pop(key, None)
+
+        if deadline is None:
+            return
+
+        _, timer = self._slots[deadline % len(self._slots)].pop(key)
+
+        if self.journal is not None:
+            await self.journal.remove(key)
+
+        return timer
+
+    async def _fire(self, key: str, timer: BaseTimerEvent) -> None:
+        # Claims the timer, it may have been fired by another process sharing the journal
+        if self.journal is not None and not await self.journal.remove(key):
+            return
+
+        try:
+            await self.callback(timer)
+        except Exception as e:
+            logger.error(f"Failed to dispatch short timer {timer.event}: {e}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            if not self._entries:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            next_tick = self._processed + 1
+            await asyncio.sleep(max(0.0, self._origin + next_tick * self.tick - loop.time()))
+
+            current = self._current_tick()
+            # Every slot has to be visited at most once, even if the loop stalled for longer than a revolution
+            for tick in range(max(next_tick, current - len(self._slots) + 1), current + 1):
+                slot = self._slots[tick % len(self._slots)]
+                expired = [(key, timer) for key, (deadline, timer) in slot.items() if deadline <= current]
+
+                for key, timer in expired:
+                    del slot[key]
+                    del self._entries[key]
+                    task = asyncio.create_task(self._fire(key, timer))
+                    self._firing.add(task)
+                    task.add_done_callback(self._firing.discard)
+
+            self._processed = max(self._processed, current)
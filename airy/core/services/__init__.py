@@ -0,0 +1,4 @@
+from .guild_config import GuildConfigService
+from .muted_members import MutedMemberService
+
+__all__ = ("GuildConfigService", "MutedMemberService")
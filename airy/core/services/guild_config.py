@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import typing as t
+
+import hikari
+
+from airy.core.models import GuildModel
+
+if t.TYPE_CHECKING:
+    from ..bot import Airy
+
+__all__ = ("GuildConfigService",)
+
+logger = logging.getLogger(__name__)
+
+
+class GuildConfigService:
+    """Keeps the :class:`GuildModel` of every guild in memory.
+
+    Configs are loaded on first use and every change made through the
+    service is written through to the database, so reads never hit it twice.
+    Guilds without a config are cached as well.
+    """
+
+    def __init__(self, bot: Airy) -> None:
+        self.bot = bot
+        self._configs: t.Dict[int, t.Optional[GuildModel]] = {}
+        self._loading: t.Dict[int, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    async def _load(self, guild_id: int) -> t.Optional[GuildModel]:
+        config = await GuildModel.filter(guild_id=guild_id).first()
+        # The config might have been written while it was being loaded
+        return self._configs.setdefault(guild_id, config)
+
+    async def get(self, guild_id: hikari.Snowflakeish) -> t.Optional[GuildModel]:
+        """Return the config of a guild, or None if it has none."""
+        guild_id = int(guild_id)
+        try:
+            return self._configs[guild_id]
+        except KeyError:
+            pass
+
+        # Concurrent lookups of the same guild share one query
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = self._loading[guild_id] = asyncio.create_task(self._load(guild_id))
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+
+        return await asyncio.shield(task)
+
+    async def get_or_create(self, guild_id: hikari.Snowflakeish, **defaults: t.Any) -> GuildModel:
+        """Return the config of a guild, creating it with the given fields if it has none."""
+        config = await self.get(guild_id)
+        if config is None:
+            config, _ = await GuildModel.get_or_create(defaults, guild_id=int(guild_id))
+            self._configs[int(guild_id)] = config
+
+        return config
+
+    async def save(self, config: GuildModel, update_fields: t.Optional[t.Iterable[str]] = None) -> None:
+        """Write a config to the database and keep it as the cached one."""
+        try:
+            await config.save(update_fields=update_fields)
+        except Exception:
+            # The cached object may hold changes that never made it to the database
+            self.evict(config.guild_id)
+            raise
+
+        self._configs[config.guild_id] = config
+
+    async def update(self, guild_id: hikari.Snowflakeish, **fields: t.Any) -> None:
+        """Update fields of a guild's config, both in the database and in memory."""
+        guild_id = int(guild_id)
+        await GuildModel.filter(guild_id=guild_id).update(**fields)
+
+        config = self._configs.get(guild_id)
+        if config is not None:
+            for name, value in fields.items():
+                setattr(config, name, value)
+
+    async def delete(self, guild_id: hikari.Snowflakeish) -> None:
+        """Delete the config of a guild."""
+        await GuildModel.filter(guild_id=int(guild_id)).delete()
+        # Dropped rather than cached as missing, the guild may add the bot again
+        self.evict(guild_id)
+
+    def evict(self, guild_id: hikari.Snowflakeish) -> None:
+        """Forget the cached config of a guild, the next lookup loads it again."""
+        self._configs.pop(int(guild_id), None)
+
+    async def on_guild_leave(self, event: hikari.GuildLeaveEvent) -> None:
+        self.evict(event.guild_id)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import typing as t
+
+import hikari
+from tortoise import Tortoise
+
+if t.TYPE_CHECKING:
+    from ..bot import Airy
+
+__all__ = ("MutedMemberService",)
+
+logger = logging.getLogger(__name__)
+
+
+class MutedMemberService:
+    """Muted members, stored one row per member in the ``muted_member`` table.
+
+    Every change is a single atomic statement, so concurrent mutes of the
+    same guild can not overwrite each other. Once :meth:`load` ran, an index
+    of the muted members of every guild is kept in memory, so checking
+    whether a member is muted never hits the database.
+    """
+
+    def __init__(self, bot: Airy, connection_name: str = "default") -> None:
+        self.bot = bot
+        self.connection_name = connection_name
+        self._index: t.Dict[int, t.Set[int]] = {}
+        self._loaded: bool = False
+
+    @property
+    def _connection(self):
+        return Tortoise.get_connection(self.connection_name)
+
+    async def load(self) -> None:
+        """Load the index of muted members."""
+        rows = await self._connection.execute_query_dict('SELECT "guild_id", "user_id" FROM "muted_member"')
+
+        index: t.Dict[int, t.Set[int]] = {}
+        for row in rows:
+            index.setdefault(row["guild_id"], set()).add(row["user_id"])
+
+        self._index = index
+        self._loaded = True
+        logger.info(f"Loaded {len(rows)} muted members of {len(index)} guilds")
+
+    def __contains__(self, item: t.Tuple[hikari.Snowflakeish, hikari.Snowflakeish]) -> bool:
+        guild_id, user_id = item
+        muted = self._index.get(int(guild_id))
+        return muted is not None and int(user_id) in muted
+
+    async def add(self,
+                  guild_id: hikari.Snowflakeish,
+                  user_id: hikari.Snowflakeish,
+                  expires: t.Optional[datetime.datetime] = None) -> bool:
+        """Mark a member as muted, until `expires` if specified. Returns False if they already were."""
+        rows = await self._connection.execute_query_dict(
+            """
+            INSERT INTO "muted_member" ("guild_id", "user_id", "expires") VALUES ($1, $2, $3)
+            ON CONFLICT ("guild_id", "user_id") DO UPDATE SET "expires" = EXCLUDED."expires"
+            RETURNING (xmax = 0) AS "inserted"
+            """,
+            [int(guild_id), int(user_id), expires],
+        )
+        self._index.setdefault(int(guild_id), set()).add(int(user_id))
+        return rows[0]["inserted"]
+
+    async def remove(self, guild_id: hikari.Snowflakeish, user_id: hikari.Snowflakeish) -> bool:
+        """Mark a member as no longer muted. Returns False if they were not."""
+        rows = await self._connection.execute_query_dict(
+            'DELETE FROM "muted_member" WHERE "guild_id" = $1 AND "user_id" = $2 RETURNING "user_id"',
+            [int(guild_id), int(user_id)],
+        )
+
+        muted = self._index.get(int(guild_id))
+        if muted is not None:
+            muted.discard(int(user_id))
+            if not muted:
+                del self._index[int(guild_id)]
+
+        return bool(rows)
+
+    async def remove_guild(self, guild_id: hikari.Snowflakeish) -> None:
+        """Forget every muted member of a guild."""
+        await self._connection.execute_query('DELETE FROM "muted_member" WHERE "guild_id" = $1', [int(guild_id)])
+        self._index.pop(int(guild_id), None)
+
+    async def is_muted(self, guild_id: hikari.Snowflakeish, user_id: hikari.Snowflakeish) -> bool:
+        if self._loaded:
+            return (guild_id, user_id) in self
+
+        rows = await self._connection.execute_query_dict(
+            'SELECT 1 FROM "muted_member" WHERE "guild_id" = $1 AND "user_id" = $2',
+            [int(guild_id), int(user_id)],
+        )
+        return bool(rows)
+
+    async def count(self, guild_id: hikari.Snowflakeish) -> int:
+        """The amount of muted members of a guild, counted from the primary key alone."""
+        rows = await self._connection.execute_query_dict(
+            'SELECT count(*) AS "total" FROM "muted_member" WHERE "guild_id" = $1',
+            [int(guild_id)],
+        )
+        return rows[0]["total"]
@@ -20,7 +20,7 @@ class IntervalLoop:
             seconds = seconds or 0
             minutes = minutes or 0
             hours = hours or 0
-            days = hours or 0
+            days = days or 0
 
         self._coro = callback
         self._task: t.Optional[asyncio.Task] = None
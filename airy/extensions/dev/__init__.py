@@ -15,7 +15,7 @@ from tortoise.transactions import in_transaction
 
 import airy
 from airy.config.database import db_config
-from airy.core import AuthorOnlyNavigator, AiryPrefixContext, AuthorOnlyView, Airy, BlacklistModel, GuildModel
+from airy.core import AuthorOnlyNavigator, AiryPrefixContext, AuthorOnlyView, Airy, BlacklistModel
 from airy.utils import RespondEmbed
 
 logger = logging.getLogger(__name__)
@@ -420,7 +420,8 @@ async def resetsettings_cmd(ctx: AiryPrefixContext, guild_id: int) -> None:
     if not confirmed:
         return await ctx.event.message.add_reaction("❌")
 
-    await GuildModel.filter(guild_id=guild_id).delete()
+    await ctx.bot.guild_config.delete(guild_id)
+    await ctx.bot.muted_members.remove_guild(guild_id)
 
     await ctx.event.message.add_reaction("✅")
     await ctx.respond(f"✅ Wiped data for guild `{guild.id}`.")
@@ -9,7 +9,7 @@ import lightbulb
 from pygount import SourceAnalysis
 
 import airy
-from airy.core import Airy, AiryPlugin, GuildModel
+from airy.core import Airy, AiryPlugin
 from airy.static import ColorEnum
 
 
@@ -71,7 +71,7 @@ async def on_guild_join(event: hikari.GuildJoinEvent):
     e = hikari.Embed(colour=ColorEnum.EMBED_GREEN, title='New Guild')
     await mp.send_guild_stats(e, event.get_guild())
 
-    await GuildModel.update_or_create({}, guild_id=event.guild_id)
+    await mp.bot.guild_config.get_or_create(event.guild_id)
 
     if event.guild.system_channel_id is None:
         return
@@ -105,7 +105,8 @@ async def on_guild_leave(event: hikari.GuildLeaveEvent):
     e = hikari.Embed(colour=ColorEnum.ERROR, title='Left Guild')
     await mp.send_guild_stats(e, event.old_guild)
 
-    await GuildModel.filter(guild_id=event.guild_id).delete()
+    await mp.bot.guild_config.delete(event.guild_id)
+    await mp.bot.muted_members.remove_guild(event.guild_id)
     logging.info(f"Bot has been removed from guild {event.guild_id}, correlating data erased.")
 
 
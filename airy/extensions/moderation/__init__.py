@@ -1,18 +1,39 @@
+import asyncio
 import datetime
+import time
 
 import hikari
 import lightbulb
-from tortoise.expressions import Q
 
-from airy.core import GuildModel, TimerModel, AirySlashContext
+from airy.core import AirySlashContext, RaidMode
 from airy.core.scheduler.timers import MuteEvent
 from airy.utils import human_timedelta, utcnow, format_relative, RespondEmbed
+from .checker import SpamChecker
 from .convertors import ActionReason
 
 mod_plugin = lightbulb.Plugin("Moderation")
+spam_checker = SpamChecker()
+# How long spammers are muted for during raid mode
+SPAM_MUTE_DURATION = datetime.timedelta(minutes=30)
 
 
-async def update_mute_role_permissions(ctx: lightbulb.SlashContext, role: hikari.Role):
+# Denied to the mute role, per channel type
+MUTE_ROLE_DENY = {
+    hikari.ChannelType.GUILD_TEXT: hikari.Permissions.SEND_MESSAGES | hikari.Permissions.ADD_REACTIONS,
+    hikari.ChannelType.GUILD_VOICE: hikari.Permissions.USE_VOICE_ACTIVITY | hikari.Permissions.SPEAK,
+}
+
+
+async def update_mute_role_permissions(ctx: lightbulb.SlashContext,
+                                       role: hikari.Role,
+                                       concurrency: int = 8,
+                                       progress_interval: float = 2.0):
+    """Deny the mute role on every text and voice channel of the guild.
+
+    Edits run concurrently, at most `concurrency` at a time, hikari waits out the
+    ratelimit buckets of the route by itself. Channels whose overwrite already
+    matches are skipped. Progress is shown through `edit_last_response`.
+    """
     success = 0
     failure = 0
     skipped = 0
@@ -20,31 +41,52 @@ async def update_mute_role_permissions(ctx: lightbulb.SlashContext, role: hikari
 
     guild = ctx.get_guild() or await ctx.bot.rest.fetch_guild(ctx.guild_id)
 
+    pending = []
     for channel in guild.get_channels().values():
-        try:
-            if channel.type == hikari.ChannelType.GUILD_TEXT:
-                await channel.edit_overwrite(role,
-                                             target_type=hikari.PermissionOverwriteType.ROLE,
-                                             deny=(hikari.Permissions.SEND_MESSAGES |
-                                                   hikari.Permissions.ADD_REACTIONS),
-                                             reason=reason)
-            elif channel.type == hikari.ChannelType.GUILD_VOICE:
+        deny = MUTE_ROLE_DENY.get(channel.type)
+        overwrite = channel.permission_overwrites.get(role.id)
+
+        if deny is None or (overwrite is not None and overwrite.deny == deny and not overwrite.allow):
+            skipped += 1
+        else:
+            pending.append((channel, deny))
+
+    total = len(pending)
+    semaphore = asyncio.Semaphore(concurrency)
+    last_progress = time.monotonic()
+
+    async def edit(channel: hikari.GuildChannel, deny: hikari.Permissions) -> None:
+        nonlocal success, failure, last_progress
+
+        async with semaphore:
+            try:
                 await channel.edit_overwrite(role,
                                              target_type=hikari.PermissionOverwriteType.ROLE,
-                                             deny=hikari.Permissions.USE_VOICE_ACTIVITY | hikari.Permissions.SPEAK,
+                                             deny=deny,
                                              reason=reason)
-        except (hikari.ForbiddenError, hikari.HTTPError, hikari.NotFoundError):
-            failure += 1
-        else:
-            success += 1
-    else:
-        skipped += 1
+            except (hikari.ForbiddenError, hikari.HTTPError, hikari.NotFoundError):
+                failure += 1
+            else:
+                success += 1
+
+        # The interaction response has its own ratelimit, so progress is only shown now and then
+        if time.monotonic() - last_progress >= progress_interval and success + failure < total:
+            last_progress = time.monotonic()
+            try:
+                await ctx.edit_last_response(f'Updating channel permissions... {success + failure}/{total}')
+            except hikari.HTTPError:
+                pass
+
+    await asyncio.gather(*(edit(channel, deny) for channel, deny in pending))
 
     return success, failure, skipped
 
 
 @mod_plugin.listener(MuteEvent)
 async def on_tempmute_timer_complete(event: MuteEvent):
+    # The mute is over even if the role can not be removed anymore
+    await mod_plugin.bot.muted_members.remove(event.guild_id, event.muted_user_id)
+
     guild = mod_plugin.bot.cache.get_guild(event.guild_id)
     if guild is None:
         # RIP
@@ -74,16 +116,74 @@ async def on_tempmute_timer_complete(event: MuteEvent):
     else:
         reason = f'Expiring self-mute made on {event.created} by {member}'
 
-    config = await GuildModel.filter(guild_id=event.guild_id).first()
-    config.muted_members.remove(event.muted_user_id)
-    await config.save()
-
     try:
         await mod_plugin.bot.rest.remove_role_from_member(guild, member, event.role_id, reason=reason)
     except hikari.HTTPError:
         pass
 
 
+@mod_plugin.listener(hikari.MemberCreateEvent)
+async def on_muted_member_rejoin(event: hikari.MemberCreateEvent):
+    # Checked against the in-memory index, joins never hit the database
+    if (event.guild_id, event.user_id) not in mod_plugin.bot.muted_members:
+        return
+
+    config = await mod_plugin.bot.guild_config.get(event.guild_id)
+    if config is None or config.mute_role_id is None:
+        return
+
+    try:
+        await event.member.add_role(config.mute_role_id, reason='Re-applying mute after rejoining')
+    except hikari.HTTPError:
+        pass
+
+
+@mod_plugin.listener(hikari.MemberCreateEvent)
+async def on_member_join_spam_check(event: hikari.MemberCreateEvent):
+    spam_checker.is_fast_join(event.member)
+
+
+@mod_plugin.listener(hikari.GuildMessageCreateEvent)
+async def on_message_spam_check(event: hikari.GuildMessageCreateEvent):
+    if not event.is_human:
+        return
+
+    config = await mod_plugin.bot.guild_config.get(event.guild_id)
+    if config is None or config.raid_mode == RaidMode.off:
+        return
+
+    if not spam_checker.is_spamming(event.message, event.member):
+        return
+
+    reason = 'Auto-moderation for spamming during raid mode'
+    try:
+        if config.raid_mode == RaidMode.strict:
+            await mod_plugin.bot.rest.ban_member(event.guild_id, event.author_id, reason=reason)
+            return
+
+        await event.message.delete()
+        if config.mute_role_id is not None and (event.guild_id, event.author_id) not in mod_plugin.bot.muted_members:
+            await mod_plugin.bot.rest.add_role_to_member(event.guild_id, event.author_id, config.mute_role_id,
+                                                         reason=reason)
+
+            # A tempmute, so the mute is lifted and no longer re-applied on rejoin once it expires
+            expires = utcnow() + SPAM_MUTE_DURATION
+            await mod_plugin.bot.muted_members.add(event.guild_id, event.author_id, expires=expires)
+            await mod_plugin.bot.scheduler.create_timer(MuteEvent,
+                                                        expires,
+                                                        mod_plugin.bot.get_me().id,
+                                                        event.author_id,
+                                                        event.guild_id,
+                                                        config.mute_role_id)
+    except hikari.HTTPError:
+        pass
+
+
+@mod_plugin.listener(hikari.GuildLeaveEvent)
+async def on_guild_leave_spam_check(event: hikari.GuildLeaveEvent):
+    spam_checker.remove_guild(event.guild_id)
+
+
 @mod_plugin.command()
 @lightbulb.add_cooldown(3, 3, lightbulb.cooldowns.buckets.UserBucket)
 @lightbulb.command("member", "Commands for manage members", pass_options=True)
@@ -118,13 +218,12 @@ async def member_unmute(ctx: AirySlashContext, user: hikari.Member, *, reason: A
     if reason is None:
         reason = f'Action done by {ctx.author} (ID: {ctx.author.id})'
 
-    guild_config = await GuildModel.filter(guild_id=ctx.guild_id).first()
-    if guild_config and not guild_config.mute_role_id:
+    guild_config = await ctx.bot.guild_config.get(ctx.guild_id)
+    if not guild_config or not guild_config.mute_role_id:
         return await ctx.respond(embed=RespondEmbed.error('Mute role missing'))
     await ctx.bot.rest.remove_role_from_member(ctx.guild_id, user, reason=reason, role=guild_config.mute_role_id)
-    _ = (await TimerModel
-         .filter(Q(event='mute') & Q(extra__contains={"args": [ctx.author.id]}))
-         .delete())
+    await ctx.bot.muted_members.remove(ctx.guild_id, user.id)
+    await ctx.bot.scheduler.cancel_targeted_timers('mute', ctx.guild_id, user.id)
 
     await ctx.respond(embed=RespondEmbed.success('Successfully unmute member'))
 
@@ -161,17 +260,16 @@ async def tempmute(ctx: AirySlashContext,
     if reason is None:
         reason = f'Action done by {ctx.author} (ID: {ctx.author.id})'
 
-    config = await GuildModel.filter(guild_id=ctx.guild_id).first()
+    config = await ctx.bot.guild_config.get(ctx.guild_id)
 
     if not config or not config.mute_role_id:
         return await ctx.respond(embed=RespondEmbed.error('Mute role missing'), flags=hikari.MessageFlag.EPHEMERAL)
 
-    await ctx.bot.rest.add_role_to_member(ctx.guild_id, user, config.mute_role_id, reason=reason)
+    duration = await ctx.bot.scheduler.convert_time(duration)
 
-    config.muted_members.append(user.id)
-    await config.save()
+    await ctx.bot.rest.add_role_to_member(ctx.guild_id, user, config.mute_role_id, reason=reason)
+    await ctx.bot.muted_members.add(ctx.guild_id, user.id, expires=duration)
 
-    duration = await ctx.bot.scheduler.convert_time(duration)
     await ctx.bot.scheduler.create_timer(MuteEvent, duration, ctx.author.id, user.id, ctx.guild_id, config.mute_role_id)
     await ctx.respond(f'Muted {user} for {format_relative(duration)}.')
 
@@ -201,17 +299,15 @@ async def member_mute(ctx: AirySlashContext,
     permission at the server level.
     """
 
-    config = await GuildModel.filter(guild_id=ctx.guild_id).first()
+    config = await ctx.bot.guild_config.get(ctx.guild_id)
     if not config or not config.mute_role_id:
         return await ctx.respond(embed=RespondEmbed.error('Mute role missing'), flags=hikari.MessageFlag.EPHEMERAL)
 
     if reason is None:
         reason = f'Action done by {ctx.author.username} (ID: {ctx.author.id})'
 
-    config.muted_members.append(user.id)
-    await config.save()
-
     await ctx.bot.rest.add_role_to_member(ctx.guild_id, user, reason=reason, role=config.mute_role_id)
+    await ctx.bot.muted_members.add(ctx.guild_id, user.id)
     return await ctx.respond('Successfully muted member')
 
 
@@ -235,11 +331,11 @@ async def selfmute(ctx: AirySlashContext, duration: str):
     Do not ask a moderator to unmute you.
     """
 
-    config = await GuildModel.filter(guild_id=ctx.guild_id).first()
+    config = await ctx.bot.guild_config.get(ctx.guild_id)
     if not config or not config.mute_role_id:
         return await ctx.respond(embed=RespondEmbed.error('Mute role missing'), flags=hikari.MessageFlag.EPHEMERAL)
 
-    if ctx.author.id in config.muted_members:
+    if await ctx.bot.muted_members.is_muted(ctx.guild_id, ctx.author.id):
         return await ctx.respond(embed=RespondEmbed.error('Somehow you are already muted'),
                                  flags=hikari.MessageFlag.EPHEMERAL)
 
@@ -263,9 +359,7 @@ async def selfmute(ctx: AirySlashContext, duration: str):
                                          ctx.author.id,
                                          ctx.guild_id,
                                          config.mute_role_id)
-
-    config.muted_members.append(ctx.author.id)
-    await config.save()
+    await ctx.bot.muted_members.add(ctx.guild_id, ctx.author.id, expires=duration)
 
     await ctx.respond(embed=RespondEmbed.success(title=f'Muted for {delta}',
                                                  description='Be sure not to bother anyone about it.'))
@@ -293,13 +387,13 @@ async def mute_role_stats(ctx: AirySlashContext):
     To use these commands you need to have Manage Roles
     and Manage Server permission at the server level.
     """
-    config = await GuildModel.filter(guild_id=ctx.guild_id).first()
+    config = await ctx.bot.guild_config.get(ctx.guild_id)
     if not config:
         return ctx.respond(embed=RespondEmbed.error('No mute role setup'),
                            flags=hikari.MessageFlag.EPHEMERAL)
     role = ctx.bot.cache.get_role(config.mute_role_id)
     if role is not None:
-        total = len(config.muted_members)
+        total = await ctx.bot.muted_members.count(ctx.guild_id)
         role = f'{role} (ID: {role.id})'
     else:
         total = 0
@@ -325,7 +419,7 @@ async def mute_role_update(ctx: AirySlashContext):
     and Manage Server permission at the server level.
     """
 
-    config = await GuildModel.filter(guild_id=ctx.guild_id).first()
+    config = await ctx.bot.guild_config.get(ctx.guild_id)
     if config and config.mute_role_id is not None:
 
         role = ctx.bot.cache.get_role(config.mute_role_id) or \
@@ -364,7 +458,7 @@ async def mute_role_create(ctx: AirySlashContext, name: str):
     and Manage Server permission at the server level.
     """
 
-    config = await GuildModel.filter(guild_id=ctx.guild_id).first()
+    config = await ctx.bot.guild_config.get(ctx.guild_id)
     if config and config.mute_role_id is not None:
         return await ctx.respond('A mute role already exists.', flags=hikari.MessageFlag.EPHEMERAL)
 
@@ -373,13 +467,13 @@ async def mute_role_create(ctx: AirySlashContext, name: str):
                                           reason=f'Mute Role Created By {ctx.author} (ID: {ctx.author.id})')
     if config:
         config.mute_role_id = role.id
-        await config.save(update_fields=['mute_role_id'])
+        await ctx.bot.guild_config.save(config, update_fields=['mute_role_id'])
     else:
-        await GuildModel.create(guild_id=ctx.guild_id, mute_role_id=role.id)
+        await ctx.bot.guild_config.get_or_create(ctx.guild_id, mute_role_id=role.id)
 
     status = await ctx.confirm('Would you like to update the channel overwrites as well?')
 
-    if status:
+    if not status:
         return await ctx.respond('Mute role successfully created.')
 
     await ctx.edit_last_response("Processing...", flags=hikari.MessageFlag.LOADING, components=[])
@@ -404,7 +498,7 @@ async def mute_role_unbind(ctx: AirySlashContext):
     To use these commands you need to have Manage Roles
     and Manage Server permission at the server level.
     """
-    await GuildModel.filter(guild_id=ctx.guild_id).update(mute_role_id=None)
+    await ctx.bot.guild_config.update(ctx.guild_id, mute_role_id=None)
     await ctx.respond('Successfully unbound mute role.')
 
 
@@ -1,10 +1,14 @@
+from __future__ import annotations
+
+import datetime
+import typing as t
+
 import hikari
-import lightbulb
 
+from airy.utils import utcnow, GCRA
+from airy.utils.cache import ExpiringCache
 
-class CooldownByContent(lightbulb.cooldowns.CooldownManager):
-    def _bucket_key(self, message):
-        return (message.channel.id, message.content)
+__all__ = ("SpamChecker",)
 
 
 class SpamChecker:
@@ -19,79 +23,63 @@ class SpamChecker:
     just catches regular singular spam bots.
 
     From experience these values aren't reached unless someone is actively spamming.
+
+    Every check is O(1) per message and idle keys are evicted, so a single
+    checker can serve every guild.
     """
-    def __init__(self):
-        self.by_content = CooldownByContent.from_cooldown(15, 17.0, commands.BucketType.member)
-        self.by_user = commands.CooldownMapping.from_cooldown(10, 12.0, commands.BucketType.user)
-        self.last_join = None
-        self.new_user = commands.CooldownMapping.from_cooldown(30, 35.0, commands.BucketType.channel)
-
-        # user_id flag mapping (for about 30 minutes)
-        self.fast_joiners = cache.ExpiringCache(seconds=1800.0)
-        self.hit_and_run = commands.CooldownMapping.from_cooldown(10, 12, commands.BucketType.channel)
-
-    def is_new(self, member):
-        now = discord.utils.utcnow()
+
+    def __init__(self) -> None:
+        # Rates over the timestamps of the messages
+        self.by_content = GCRA(17.0, 15)  # (channel_id, hash of the content)
+        self.by_user = GCRA(12.0, 10)  # (guild_id, user_id)
+        self.new_user = GCRA(35.0, 30)  # channel_id
+        self.hit_and_run = GCRA(12.0, 10)  # channel_id
+
+        self.last_join: t.Dict[hikari.Snowflake, datetime.datetime] = {}
+        # (guild_id, user_id) flag mapping (for about 30 minutes)
+        self.fast_joiners = ExpiringCache(seconds=1800.0)
+
+    @staticmethod
+    def is_new(member: hikari.Member) -> bool:
+        now = utcnow()
         seven_days_ago = now - datetime.timedelta(days=7)
         ninety_days_ago = now - datetime.timedelta(days=90)
         return member.created_at > ninety_days_ago and member.joined_at > seven_days_ago
 
-    def is_spamming(self, message):
-        if message.guild is None:
+    def is_spamming(self, message: hikari.Message, member: t.Optional[hikari.Member] = None) -> bool:
+        if message.guild_id is None:
             return False
 
         current = message.created_at.timestamp()
 
-        if message.author.id in self.fast_joiners:
-            bucket = self.hit_and_run.get_bucket(message)
-            if bucket.update_rate_limit(current):
+        if (message.guild_id, message.author.id) in self.fast_joiners:
+            if not self.hit_and_run.acquire(message.channel_id, current):
                 return True
 
-        if self.is_new(message.author):
-            new_bucket = self.new_user.get_bucket(message)
-            if new_bucket.update_rate_limit(current):
+        if member is not None and self.is_new(member):
+            if not self.new_user.acquire(message.channel_id, current):
                 return True
 
-        user_bucket = self.by_user.get_bucket(message)
-        if user_bucket.update_rate_limit(current):
+        if not self.by_user.acquire((message.guild_id, message.author.id), current):
             return True
 
-        content_bucket = self.by_content.get_bucket(message)
-        if content_bucket.update_rate_limit(current):
+        if message.content and not self.by_content.acquire((message.channel_id, hash(message.content)), current):
             return True
 
         return False
 
-    def is_fast_join(self, member):
-        joined = member.joined_at or discord.utils.utcnow()
-        if self.last_join is None:
-            self.last_join = joined
-            return False
-        is_fast = (joined - self.last_join).total_seconds() <= 2.0
-        self.last_join = joined
-        if is_fast:
-            self.fast_joiners[member.id] = True
-        return is_fast
-
-## Checks
-
-class NoMuteRole(commands.CommandError):
-    def __init__(self):
-        super().__init__('This server does not have a mute role set up.')
+    def is_fast_join(self, member: hikari.Member) -> bool:
+        joined = member.joined_at or utcnow()
+        last_join = self.last_join.get(member.guild_id)
+        self.last_join[member.guild_id] = joined
 
-def can_mute():
-    async def predicate(ctx):
-        is_owner = await ctx.bot.is_owner(ctx.author)
-        if ctx.guild is None:
+        if last_join is None:
             return False
 
-        if not ctx.author.guild_permissions.manage_roles and not is_owner:
-            return False
+        is_fast = (joined - last_join).total_seconds() <= 2.0
+        if is_fast:
+            self.fast_joiners[(member.guild_id, member.id)] = True
+        return is_fast
 
-        # This will only be used within this cog.
-        ctx.guild_config = config = await ctx.cog.get_guild_config(ctx.guild.id)
-        role = config and config.mute_role
-        if role is None:
-            raise NoMuteRole()
-        return ctx.author.top_role > role
-    return commands.check(predicate)
\ No newline at end of file
+    def remove_guild(self, guild_id: hikari.Snowflake) -> None:
+        self.last_join.pop(guild_id, None)
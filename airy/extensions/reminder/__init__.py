@@ -4,13 +4,13 @@ import textwrap
 
 import hikari
 import lightbulb
-from tortoise.expressions import Q
 
-from airy.core import Airy, AirySlashContext, TimerModel, AiryPlugin
-from airy.core.scheduler import ConversionMode
+from airy.core import Airy, AirySlashContext, AiryPlugin
+from airy.core.scheduler import ConversionMode, Scheduler
 from airy.core.scheduler.timers import ReminderEvent
 from airy.static import ColorEnum
-from airy.utils import RespondEmbed, time, formats
+from airy.utils import RespondEmbed, AiryPages, time, formats
+from airy.utils.paginator import menus
 
 
 class ReminderPlugin(AiryPlugin):
@@ -23,6 +23,64 @@ class ReminderPlugin(AiryPlugin):
 plugin = ReminderPlugin()
 
 
+class ReminderPageSource(menus.PageSource):
+    """Pages through the reminders of a user with keyset pagination on (expires, id)."""
+
+    def __init__(self, scheduler: Scheduler, owner_id: int, *, per_page: int = 10):
+        self.scheduler = scheduler
+        self.owner_id = owner_id
+        self.per_page = per_page
+        self.total = 0
+        # The (expires, id) of the last reminder of every page that was already fetched
+        self._cursors: list[tuple] = []
+        self._pages: dict[int, list[ReminderEvent]] = {}
+
+    async def prepare(self):
+        self.total = await self.scheduler.count_owned_timers('reminder', self.owner_id)
+
+    def is_paginating(self):
+        return self.total > self.per_page
+
+    def get_max_pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    async def _fetch_page(self, page_number: int) -> list[ReminderEvent]:
+        after = self._cursors[page_number - 1] if page_number > 0 else None
+        records = await self.scheduler.get_owned_timers('reminder', self.owner_id, limit=self.per_page, after=after)
+        self._pages[page_number] = records
+
+        if records and len(self._cursors) == page_number:
+            self._cursors.append((records[-1].expires, records[-1].id))
+
+        return records
+
+    async def get_page(self, page_number):
+        if page_number in self._pages:
+            return self._pages[page_number]
+
+        # Walk forward from the last known cursor, pages can not be skipped with keyset pagination
+        for number in range(len(self._cursors), page_number):
+            if not await self._fetch_page(number):
+                return []
+
+        return await self._fetch_page(page_number)
+
+    async def format_page(self, menu, records):
+        e = hikari.Embed(colour=ColorEnum.blurple.value, title='Reminders')
+
+        for timer in records:
+            shorten = textwrap.shorten(timer.args[1], width=512)
+            e.add_field(name=f'{timer.id}: {time.format_relative(timer.expires)}', value=shorten, inline=False)
+
+        maximum = self.get_max_pages()
+        if maximum > 1:
+            e.set_footer(text=f'Page {menu.current_page + 1}/{maximum} ({self.total} reminders)')
+        else:
+            e.set_footer(text=f'{self.total} reminder{"s" if self.total > 1 else ""}')
+
+        return e
+
+
 @plugin.command()
 @lightbulb.add_cooldown(3, 3, lightbulb.cooldowns.buckets.UserBucket)
 @lightbulb.command("reminder", "Reminds you of something after a certain amount of time.")
@@ -62,30 +120,19 @@ async def reminder_create(ctx: AirySlashContext, expires: str, message: str):
 
 
 @reminder.child()
-@lightbulb.command("list", "Shows the 10 latest currently running reminders.")
+@lightbulb.command("list", "Shows your currently running reminders.")
 @lightbulb.implements(lightbulb.SlashSubCommand)
 async def reminder_list(ctx: AirySlashContext):
-    """Shows the 10 latest currently running reminders."""
+    """Shows your currently running reminders, soonest first."""
 
-    records = (await TimerModel
-               .filter(Q(event='reminder') & Q(extra__contains={"args": [ctx.author.id]}))
-               .order_by('expires')
-               .limit(10))
-    if len(records) == 0:
-        return await ctx.respond('No currently running reminders.', flags=hikari.MessageFlag.EPHEMERAL)
+    source = ReminderPageSource(ctx.bot.scheduler, ctx.author.id)
+    await source.prepare_once()
 
-    e = hikari.Embed(colour=ColorEnum.blurple.value, title='Reminders')
-
-    if len(records) == 10:
-        e.set_footer(text='Only showing up to 10 reminders.')
-    else:
-        e.set_footer(text=f'{len(records)} reminder{"s" if len(records) > 1 else ""}')
-
-    for model in records:
-        shorten = textwrap.shorten(model.extra.get('args')[1], width=512)
-        e.add_field(name=f'{model.id}: {time.format_relative(model.expires)}', value=shorten, inline=False)
+    if source.total == 0:
+        return await ctx.respond('No currently running reminders.', flags=hikari.MessageFlag.EPHEMERAL)
 
-    await ctx.respond(embed=e)
+    pages = AiryPages(source=source, ctx=ctx, compact=True)
+    await pages.send(ctx.interaction)
 
 
 @reminder.child()
@@ -116,18 +163,15 @@ async def reminder_clear(ctx: AirySlashContext):
     """Clears all reminders you have set."""
 
     # For UX purposes this has to be two queries.
-    total = await TimerModel.filter(Q(event='reminder') & Q(extra__contains={"args": [ctx.author.id]})).count()
+    total = await ctx.bot.scheduler.count_owned_timers('reminder', ctx.author.id)
 
     if total == 0:
         return await ctx.respond(embed=RespondEmbed.error('You do not have any reminders to delete.'))
 
     status = await ctx.confirm(f'Are you sure you want to delete {formats.Plural(total):reminder}?')
     if status:
-        await TimerModel.filter(Q(event='reminder') & Q(extra__contains={"args": [ctx.author.id]})).delete()
-
-        # Check if the current timer is the one being cleared and cancel it if so
-        if ctx.bot.scheduler.current_timer and ctx.bot.scheduler.current_timer.author_id == ctx.author.id:
-            await ctx.bot.scheduler.restart()
+        # Cleared timers are dropped from the scheduler's window, so none of them fires afterwards
+        total = await ctx.bot.scheduler.cancel_owned_timers('reminder', ctx.author.id)
 
         await ctx.respond(embed=RespondEmbed.success(title=f"Successfully",
                                                      description=f"Deleted `{formats.Plural(total):reminder}`."),
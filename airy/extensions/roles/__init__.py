@@ -1,13 +1,14 @@
 from airy.core import Airy
 
 from .group import group_role_plugin
-from .buttons import role_buttons
+from .buttons import role_buttons, role_button_ratelimiter
 
 
 def load(bot: Airy):
     bot.add_plugin(group_role_plugin)
     bot.add_plugin(role_buttons)
     group_role_plugin.init()
+    role_button_ratelimiter.bind(bot.redis)
 
 
 def unload(bot: Airy):
@@ -5,7 +5,7 @@ import lightbulb
 import miru
 
 from airy.core import AirySlashContext, AiryPlugin, ActionMenusModel, ActionMenusButtonModel
-from airy.utils import RateLimiter, BucketType, helpers, has_permissions, RespondEmbed, FieldPageSource, \
+from airy.utils import RedisRateLimiter, BucketType, helpers, has_permissions, RespondEmbed, FieldPageSource, \
     AiryPages
 from .enums import button_styles
 from .menu import MenuView
@@ -14,7 +14,7 @@ logger = logging.getLogger(__name__)
 
 role_buttons = AiryPlugin("RoleButtons")
 
-role_button_ratelimiter = RateLimiter(2, 1, BucketType.MEMBER, wait=False)
+role_button_ratelimiter = RedisRateLimiter("role_buttons", 2, 1, BucketType.MEMBER, wait=False)
 
 
 @role_buttons.listener(hikari.RoleDeleteEvent)
@@ -65,8 +65,7 @@ async def rolebutton_listener(plugin: AiryPlugin, event: miru.ComponentInteracti
         await event.context.respond(embed=embed, flags=hikari.MessageFlag.EPHEMERAL)
         return
 
-    await role_button_ratelimiter.acquire(event.context)
-    if role_button_ratelimiter.is_rate_limited(event.context):
+    if not await role_button_ratelimiter.acquire(event.context):
         embed = RespondEmbed.cooldown(title="Slow Down!",
                                       description="You are clicking too fast!", )
 
@@ -24,16 +24,58 @@ plugin = plugins.Plugin("VoiceRooms")
 cache = Cache()
 
 
+@plugin.listener(hikari.StartedEvent)
+async def on_started(_: hikari.StartedEvent) -> None:
+    await cache.prepare()
+
+
+@plugin.listener(hikari.GuildAvailableEvent)
+async def on_guild_available(event: hikari.GuildAvailableEvent) -> None:
+    # The channels and voice states of the guild are only cached from here on
+    await cache.restore_guild(event.guild_id)
+
+
 @plugin.listener(hikari.VoiceStateUpdateEvent)
 async def on_voice_state_update(event: hikari.VoiceStateUpdateEvent) -> None:
-    voice_creators = await VoiceChannelCreatorModel.filter(guild_id=event.guild_id, channel_id=event.state.channel_id)
-    if not voice_creators:
+    old_channel_id = event.old_state.channel_id if event.old_state is not None else None
+    channel_id = event.state.channel_id
+
+    # Every room gets only the events of its own channel, looked up by channel id
+    if old_channel_id != channel_id:
+        if (room := cache.get_room(old_channel_id)) is not None:
+            room.remove_member(event.state.user_id)
+        if (room := cache.get_room(channel_id)) is not None:
+            room.add_member(event.state.user_id)
+
+    config = cache.get_creator_config(event.guild_id, channel_id)
+    if config is None:
+        return
+
+    # Mute, deafen and stream toggles inside the creator channel do not create rooms
+    if old_channel_id == channel_id:
         return
-    config = voice_creators[0]
 
     VoiceRoom(cache, config, event.state.member)
 
 
+@plugin.listener(hikari.GuildChannelDeleteEvent)
+async def on_channel_delete(event: hikari.GuildChannelDeleteEvent) -> None:
+    if (room := cache.remove_room(event.channel_id)) is not None:
+        room.category.rooms.remove(room)
+        return
+
+    if cache.remove_creator_config(event.guild_id, event.channel_id) is None:
+        return
+
+    await VoiceChannelCreatorModel.filter(guild_id=event.guild_id, channel_id=event.channel_id).delete()
+
+
+@plugin.listener(hikari.GuildLeaveEvent)
+async def on_guild_leave(event: hikari.GuildLeaveEvent) -> None:
+    cache.remove_guild_creators(event.guild_id)
+    cache.forget_guild_snapshot(event.guild_id)
+
+
 @plugin.command
 @decorators.add_checks(checks.has_guild_permissions(hikari.Permissions.MANAGE_CHANNELS))
 @lightbulb.add_checks(lightbulb.guild_only)
@@ -76,14 +118,15 @@ async def voice_room_create(ctx: lightbulb.SlashContext,
 
     channel = ctx.bot.cache.get_guild_channel(channel)
 
-    await VoiceChannelCreatorModel.create(guild_id=ctx.guild_id,
-                                          channel_id=channel,
-                                          channel_name=channel_name,
-                                          user_limit=user_limit,
-                                          editable=editable,
-                                          auto_inc=auto_increment,
-                                          additional_category_name=additional_category_name,
-                                          sync_permissions=synchronization_perms)
+    config = await VoiceChannelCreatorModel.create(guild_id=ctx.guild_id,
+                                                   channel_id=channel.id,
+                                                   channel_name=channel_name,
+                                                   user_limit=user_limit,
+                                                   editable=editable,
+                                                   auto_inc=auto_increment,
+                                                   additional_category_name=additional_category_name,
+                                                   sync_permissions=synchronization_perms)
+    cache.set_creator_config(config)
 
     embed = hikari.Embed(title="Channel Creator successfully initialized.",
                          timestamp=utcnow()
@@ -101,10 +144,10 @@ async def voice_room_create(ctx: lightbulb.SlashContext,
     return await ctx.respond(embed=embed)
 
 
-# def load(bot: Airy) -> None:
-#     bot.add_plugin(plugin)
-#     cache.init(bot)
-#
-#
-# def unload(bot: Airy) -> None:
-#     bot.remove_plugin(plugin)
+def load(bot: Airy) -> None:
+    bot.add_plugin(plugin)
+    cache.init(bot)
+
+
+def unload(bot: Airy) -> None:
+    bot.remove_plugin(plugin)
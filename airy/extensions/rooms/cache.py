@@ -1,21 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import logging
 import typing as t
 
 import hikari
+import orjson
 
 from airy.core import Airy
+from airy.core.models import VoiceChannelCreatorModel
 
 if t.TYPE_CHECKING:
-    from .room import VoiceCategory
+    from .room import VoiceCategory, VoiceRoom
+
+log = logging.getLogger(__name__)
+
+CATEGORIES_KEY = "airy:rooms:categories"
+ROOMS_KEY = "airy:rooms:rooms"
 
 
 class Cache:
     def __init__(self):
         self.bot: t.Optional[Airy] = None
         self._cache: t.Dict[hikari.Snowflake, t.Dict[hikari.Snowflake, VoiceCategory]] = dict()
+        # guild_id -> {creator channel_id: config}, so voice events never have to query the database
+        self._creators: t.Dict[int, t.Dict[int, VoiceChannelCreatorModel]] = dict()
+        # channel_id -> the live room of that channel, voice events are routed through it
+        self._rooms: t.Dict[int, VoiceRoom] = dict()
+        # Ids of the categories and rooms that changed since the last snapshot
+        self._dirty_categories: t.Set[int] = set()
+        self._dirty_rooms: t.Set[int] = set()
+        self._flush_task: t.Optional[asyncio.Task] = None
+        # guild_id -> (categories, rooms) of the last run, until the guild is available and reconciled
+        self._snapshot: t.Dict[int, t.Tuple[t.List[dict], t.List[dict]]] = dict()
+        self._prepared: t.Optional[asyncio.Future] = None
 
     def init(self, bot: Airy):
         self.bot = bot
 
+    async def load_creators(self):
+        creators: t.Dict[int, t.Dict[int, VoiceChannelCreatorModel]] = dict()
+        for config in await VoiceChannelCreatorModel.all():
+            creators.setdefault(config.guild_id, {})[config.channel_id] = config
+
+        self._creators = creators
+        log.info(f"Loaded voice channel creators of {len(creators)} guilds")
+
+    def get_creator_config(self,
+                           guild_id: hikari.Snowflakeish,
+                           channel_id: t.Optional[hikari.Snowflakeish]) -> t.Optional[VoiceChannelCreatorModel]:
+        creators = self._creators.get(guild_id)
+        if creators is None or channel_id is None:
+            return None
+        return creators.get(channel_id)
+
+    def set_creator_config(self, config: VoiceChannelCreatorModel):
+        self._creators.setdefault(config.guild_id, {})[config.channel_id] = config
+
+    def remove_creator_config(self,
+                              guild_id: hikari.Snowflakeish,
+                              channel_id: hikari.Snowflakeish) -> t.Optional[VoiceChannelCreatorModel]:
+        creators = self._creators.get(guild_id)
+        if creators is None:
+            return None
+
+        config = creators.pop(channel_id, None)
+        if not creators:
+            del self._creators[guild_id]
+        return config
+
+    def remove_guild_creators(self, guild_id: hikari.Snowflakeish):
+        self._creators.pop(guild_id, None)
+
+    def get_room(self, channel_id: t.Optional[hikari.Snowflakeish]) -> t.Optional[VoiceRoom]:
+        if channel_id is None:
+            return None
+        return self._rooms.get(channel_id)
+
+    def add_room(self, room: VoiceRoom):
+        self._rooms[room.channel.id] = room
+        self.mark_room_dirty(room.channel.id)
+
+    def remove_room(self, channel_id: hikari.Snowflakeish) -> t.Optional[VoiceRoom]:
+        room = self._rooms.pop(channel_id, None)
+        if room is not None:
+            self.mark_room_dirty(channel_id)
+        return room
+
     def get_free_category(self, channel_id: hikari.Snowflake):
         categories = self._cache.get(channel_id)
 
@@ -42,6 +113,7 @@ class Cache:
         if not self._cache.get(channel_id):
             self.add_creator(channel_id)
         self._cache[channel_id][category.id] = category
+        self.mark_category_dirty(category.id)
 
     def remove_creator(self, channel_id: hikari.Snowflake):
         self._cache.pop(channel_id)
@@ -50,9 +122,174 @@ class Cache:
         self._cache[channel_id].pop(category.id)
         if len(self._cache[channel_id]) == 0:
             self.remove_creator(channel_id)
+        self.mark_category_dirty(category.id)
+
+    def _iter_categories(self) -> t.Iterator[VoiceCategory]:
+        for categories in self._cache.values():
+            yield from categories.values()
+
+    def _get_category(self, category_id: int) -> t.Optional[VoiceCategory]:
+        for categories in self._cache.values():
+            if category_id in categories:
+                return categories[category_id]
+        return None
+
+    def mark_category_dirty(self, category_id: hikari.Snowflakeish):
+        self._dirty_categories.add(category_id)
+        self._schedule_flush()
+
+    def mark_room_dirty(self, channel_id: hikari.Snowflakeish):
+        self._dirty_rooms.add(channel_id)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self.bot is None or (self._flush_task is not None and not self._flush_task.done()):
+            return
+        self._flush_task = self.bot.create_task(self._flush())
+
+    async def _flush(self):
+        # Changes made while a snapshot is written are picked up by the next round
+        while self._dirty_categories or self._dirty_rooms:
+            categories, self._dirty_categories = self._dirty_categories, set()
+            rooms, self._dirty_rooms = self._dirty_rooms, set()
+
+            try:
+                async with self.bot.redis.pipeline(transaction=False) as pipe:
+                    for category_id in categories:
+                        category = self._get_category(category_id)
+                        if category is not None:
+                            pipe.hset(CATEGORIES_KEY, category_id, orjson.dumps(category.to_dict()))
+                        else:
+                            pipe.hdel(CATEGORIES_KEY, category_id)
+
+                    for channel_id in rooms:
+                        room = self._rooms.get(channel_id)
+                        if room is not None:
+                            pipe.hset(ROOMS_KEY, channel_id, orjson.dumps(room.to_dict()))
+                        else:
+                            pipe.hdel(ROOMS_KEY, channel_id)
+
+                    await pipe.execute()
+            except Exception as e:
+                log.error(f"Failed to snapshot voice rooms to redis: {e}")
+                self._dirty_categories |= categories
+                self._dirty_rooms |= rooms
+                return
 
-    async def load_from_redis(self):
-        pass
+    async def prepare(self):
+        """Load the creators and the snapshot of the last run, once."""
+        if self._prepared is None:
+            self._prepared = asyncio.ensure_future(self._prepare())
+        await asyncio.shield(self._prepared)
+
+    async def _prepare(self):
+        await self.load_creators()
+
+        try:
+            await self.load_snapshot()
+        except Exception as e:
+            log.error(f"Failed to load the voice rooms snapshot from redis: {e}")
+
+    async def load_snapshot(self):
+        """Read the categories and rooms of the last run, grouped by guild, to be restored by :meth:`restore_guild`."""
+        categories_data = await self.bot.redis.hgetall(CATEGORIES_KEY)
+        rooms_data = await self.bot.redis.hgetall(ROOMS_KEY)
+
+        guild_of: t.Dict[int, int] = {}
+        for raw in categories_data.values():
+            data = orjson.loads(raw)
+            guild_of[data["category_id"]] = data["guild_id"]
+            self._snapshot.setdefault(data["guild_id"], ([], []))[0].append(data)
+
+        for raw in rooms_data.values():
+            data = orjson.loads(raw)
+            guild_id = data.get("guild_id", guild_of.get(data["category_id"]))
+            if guild_id is None:
+                # Neither the room nor its category tell which guild it belongs to, it can not be restored
+                self.mark_room_dirty(data["channel_id"])
+                continue
+            self._snapshot.setdefault(guild_id, ([], []))[1].append(data)
+
+        log.info(f"Loaded the voice rooms snapshot of {len(self._snapshot)} guilds")
+
+    async def restore_guild(self, guild_id: hikari.Snowflakeish):
+        """Rehydrate the rooms of a guild from the last run and delete its channels that are not used anymore.
+
+        Must run once the channels and voice states of the guild are cached, e.g. on GuildAvailableEvent.
+        Only the snapshot entries of this guild are touched.
+        """
+        from .room import VoiceCategory, VoiceRoom
+
+        await self.prepare()
+        snapshot = self._snapshot.pop(int(guild_id), None)
+        if snapshot is None:
+            return
+
+        categories_data, rooms_data = snapshot
+        orphans: t.List[int] = []
+        categories: t.Dict[int, VoiceCategory] = {}
+
+        for data in categories_data:
+            category = VoiceCategory.from_dict(self, data)
+            if category is None:
+                orphans.append(data["category_id"])
+            else:
+                categories[category.id] = category
+
+        restored = 0
+        for data in rooms_data:
+            category = categories.get(data["category_id"])
+            room = VoiceRoom.from_dict(self, category, data) if category is not None else None
+
+            # A room that was left while the bot was down is deleted as well
+            if room is None or not room.members:
+                orphans.append(data["channel_id"])
+                continue
+
+            category.rooms.append(room)
+            self._rooms[room.channel.id] = room
+            restored += 1
+
+        for category in categories.values():
+            if category.rooms:
+                self._cache.setdefault(category.config.channel_id, {})[category.id] = category
+            else:
+                orphans.append(category.id)
+
+        # The snapshot of this guild is rewritten from memory: restored entries are updated, the others removed
+        for data in categories_data:
+            self.mark_category_dirty(data["category_id"])
+        for data in rooms_data:
+            self.mark_room_dirty(data["channel_id"])
+
+        orphans = [channel_id for channel_id in orphans if self.bot.cache.get_guild_channel(channel_id) is not None]
+        results = await asyncio.gather(*(self.bot.rest.delete_channel(channel_id) for channel_id in orphans),
+                                       return_exceptions=True)
+        failed = sum(isinstance(result, Exception) for result in results)
+
+        log.info(f"Restored {restored} voice rooms of guild {guild_id}, "
+                 f"deleted {len(orphans) - failed} orphaned channels ({failed} failed)")
+
+    def forget_guild_snapshot(self, guild_id: hikari.Snowflakeish):
+        """Drop the snapshot of a guild that will not be restored, e.g. because the bot left it."""
+        snapshot = self._snapshot.pop(int(guild_id), None)
+        if snapshot is None:
+            return
+
+        categories_data, rooms_data = snapshot
+        for data in categories_data:
+            self.mark_category_dirty(data["category_id"])
+        for data in rooms_data:
+            self.mark_room_dirty(data["channel_id"])
 
     async def upload_to_redis(self):
-        pass
+        """Write a full snapshot of every category and room."""
+        self._dirty_categories.clear()
+        self._dirty_rooms.clear()
+
+        async with self.bot.redis.pipeline(transaction=False) as pipe:
+            for category in self._iter_categories():
+                pipe.hset(CATEGORIES_KEY, category.id, orjson.dumps(category.to_dict()))
+            for channel_id, room in self._rooms.items():
+                pipe.hset(ROOMS_KEY, channel_id, orjson.dumps(room.to_dict()))
+            await pipe.execute()
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import asyncio
 
 import typing as t
@@ -79,11 +81,21 @@ class VoiceCategory:
             del self
 
     @classmethod
-    def from_dict(cls, data: dict):
-        pass
+    def from_dict(cls, cache: Cache, data: dict) -> t.Optional[VoiceCategory]:
+        """Rebuild a category, or return None if its channel or creator is gone."""
+        config = cache.get_creator_config(data["guild_id"], data["creator_id"])
+        channel = cache.bot.cache.get_guild_channel(data["category_id"])
+        if config is None or not isinstance(channel, hikari.GuildCategory):
+            return None
+
+        category = cls(cache, config)
+        category.category = channel
+        return category
 
     def to_dict(self):
-        pass
+        return {"category_id": self.category.id,
+                "guild_id": self.config.guild_id,
+                "creator_id": self.config.channel_id}
 
 
 class VoiceRoom:
@@ -95,18 +107,18 @@ class VoiceRoom:
 
         self.cache = cache
         self.config = config
-        self.owner = owner
+        self.owner_id: hikari.Snowflake = owner.id
 
         self._is_live = True
-        self.members: t.List[hikari.Member] = [owner]
+        self.members: t.Set[hikari.Snowflake] = {owner.id}
 
         self.number: int
         self.channel: hikari.GuildVoiceChannel
 
-        self.bot.create_task(self._loop())
+        self.bot.create_task(self.create(self.config.channel_id))
 
     def __repr__(self):
-        return f'<VoiceRoom guild_id={self.config.guild_id}, channel={self.channel.id}, owner={self.owner.id}, ' \
+        return f'<VoiceRoom guild_id={self.config.guild_id}, channel={self.channel.id}, owner={self.owner_id}, ' \
                f'user_limit={self.config.user_limit}, number={self.number}>'
 
     @property
@@ -118,14 +130,13 @@ class VoiceRoom:
         return hikari.Permissions.MANAGE_CHANNELS if self.config.editable else hikari.Permissions.NONE
 
     def get_perms(self, invoked_channel):
-        perms = [hikari.PermissionOverwrite(id=self.owner.id,
+        perms = [hikari.PermissionOverwrite(id=self.owner_id,
                                             type=hikari.PermissionOverwriteType.MEMBER,
                                             allow=self.base_perms)]
-        if len(self.members) > 1:
-            for member in self.members.copy().remove(self.owner):
-                perms.append(hikari.PermissionOverwrite(id=member.id,
-                                                        type=hikari.PermissionOverwriteType.MEMBER,
-                                                        deny=self.base_perms))
+        for member_id in self.members - {self.owner_id}:
+            perms.append(hikari.PermissionOverwrite(id=member_id,
+                                                    type=hikari.PermissionOverwriteType.MEMBER,
+                                                    deny=self.base_perms))
 
         if self.config.sync_permissions:
             perms.extend(invoked_channel.permission_overwrites.values())
@@ -150,14 +161,17 @@ class VoiceRoom:
                                                                       )
         category.rooms.append(self)
         self.category = category
+        # Registered before moving the owner in, so their join is already routed here
+        self.cache.add_room(self)
 
         await self.bot.rest.edit_member(guild=self.config.guild_id,
                                         voice_channel=self.channel.id,
-                                        user=self.owner)
+                                        user=self.owner_id)
 
     async def delete(self):
         # await asyncio.sleep(10)
 
+        self.cache.remove_room(self.channel.id)
         self.category.rooms.remove(self)
         await self.channel.delete()
 
@@ -165,38 +179,56 @@ class VoiceRoom:
         if self.channel.parent_id != invoked_channel.parent_id:
             await self.category.delete()
 
-    async def _loop(self):
-        await self.create(self.config.channel_id)
-
-        while self._is_live:
-            await self._check_state()
-
-        await self.delete()
-        del self
-
-    async def _check_state(self):
-        event: hikari.VoiceStateUpdateEvent = await self.bot.wait_for(hikari.VoiceStateUpdateEvent,
-                                                                      timeout=None)
+    def add_member(self, user_id: hikari.Snowflake):
+        """Called by the voice state router when a member joins the room."""
+        self.members.add(user_id)
+        self.cache.mark_room_dirty(self.channel.id)
 
-        if event.state is not None:
-            if event.state.channel_id == self.channel.id:
-                self.members.append(event.state.member)
-        if event.old_state:
-            if event.old_state.channel_id == self.channel.id:
-                self.members.remove(event.state.member)
+    def remove_member(self, user_id: hikari.Snowflake):
+        """Called by the voice state router when a member leaves the room."""
+        self.members.discard(user_id)
 
-            if len(self.members) == 0:
+        if not self.members:
+            if self._is_live:
                 self._is_live = False
-                return
+                self.bot.create_task(self.delete())
+            return
 
-            if self.owner not in self.members:
-                self.owner = self.members[0]
+        if self.owner_id not in self.members:
+            self.owner_id = next(iter(self.members))
 
-        return
+        self.cache.mark_room_dirty(self.channel.id)
 
     @classmethod
-    def from_dict(cls, data: dict):
-        pass
+    def from_dict(cls, cache: Cache, category: VoiceCategory, data: dict) -> t.Optional[VoiceRoom]:
+        """Rebuild a live room, or return None if its channel is gone.
+
+        Members are taken from the voice states in the cache, not from the snapshot.
+        """
+        channel = cache.bot.cache.get_guild_channel(data["channel_id"])
+        if not isinstance(channel, hikari.GuildVoiceChannel):
+            return None
+
+        # Skips __init__, which would create a new channel
+        room = cls.__new__(cls)
+        room.cache = cache
+        room.config = category.config
+        room.category = category
+        room.channel = channel
+        room.number = data["number"]
+        room._is_live = True
+        room.members = set(cache.bot.cache.get_voice_states_view_for_channel(channel.guild_id, channel.id))
+        room.owner_id = hikari.Snowflake(data["owner_id"])
+
+        if room.members and room.owner_id not in room.members:
+            room.owner_id = next(iter(room.members))
+
+        return room
 
     def to_dict(self):
-        pass
+        return {"channel_id": self.channel.id,
+                "guild_id": self.config.guild_id,
+                "category_id": self.category.id,
+                "owner_id": self.owner_id,
+                "members": list(self.members),
+                "number": self.number}
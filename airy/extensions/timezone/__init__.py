@@ -11,6 +11,7 @@ from fuzzywuzzy import process
 
 from airy.core.bot import Airy
 from airy.core.models import AirySlashContext, UserModel
+from airy.core.scheduler import get_user_timezone
 from airy.static import ColorEnum
 from airy.utils import SimplePages, RespondEmbed, format_dt
 
@@ -61,7 +62,8 @@ async def tz_cmd(_: AirySlashContext):
 async def tz_set_cmd(ctx: AirySlashContext):
     tz = ctx.options.tz
     timezones = await asyncio.threads.to_thread(process.extract, tz, choices=pytz.common_timezones, limit=8)
-    if (tz_ := timezones[0])[1] < 87:
+    tz_, score = timezones[0]
+    if score < 87:
         embed = hikari.Embed()
         embed.description = '\n'.join([f"**{index}.** {value[0]}" for index, value in enumerate(timezones, 1)])
         view = TimezoneChoice(timezones, ctx.author)
@@ -74,6 +76,7 @@ async def tz_set_cmd(ctx: AirySlashContext):
         else:
             return await ctx.edit_last_response(RespondEmbed.error("Timeout..."), components=[])
     await UserModel.update_or_create(defaults={"tz": tz_}, id=ctx.author.id)
+    get_user_timezone.invalidate(int(ctx.author.id))
     await ctx.edit_last_response(RespondEmbed.success("Timezone setup successfully."), components=[])
 
 
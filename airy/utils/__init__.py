@@ -5,5 +5,5 @@ from .embeds import *
 from .formats import Plural, human_join, TabularData, format_dt
 from .matchers import *
 from .paginator import AiryPages, SimplePages, FieldPageSource, SimplePageSource, TextPageSource
-from .ratelimiter import RateLimiter, BucketType
+from .ratelimiter import GCRA, RateLimiter, RedisRateLimiter, BucketType
 from .time import *
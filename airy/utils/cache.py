@@ -1,9 +1,16 @@
 import inspect
 import asyncio
 import enum
+import logging
 import time
+import typing as t
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from functools import partial, wraps
 
-from functools import wraps
+import aioredis
+import orjson
 
 try:
     from lru import LRU
@@ -11,16 +18,9 @@ except ImportError:
     from pylru import lrucache as LRU
 
 
-__all__ = ("Strategy", "cache", "ExpiringCache", "LRU")
+__all__ = ("Strategy", "CacheStats", "cache", "ExpiringCache", "LRU", "RedisCacheBroker", "redis_broker")
 
-
-def _wrap_and_store_coroutine(cache, key, coro):
-    async def func():
-        value = await coro
-        cache[key] = value
-        return value
-
-    return func()
+logger = logging.getLogger(__name__)
 
 
 def _wrap_new_coroutine(value):
@@ -30,109 +30,536 @@ def _wrap_new_coroutine(value):
     return new_coroutine()
 
 
-class ExpiringCache(dict):
-    def __init__(self, seconds):
+class ExpiringCache(MutableMapping):
+    """A mapping whose entries expire `seconds` after they were set.
+
+    Entries are kept in access order with a queue of deadlines in insertion order next to them,
+    so expired entries are dropped from the front of the queue in amortized O(1) on every operation.
+
+    Parameters
+    ----------
+    seconds : float
+        How long an entry lives after it was set.
+    maxsize : Optional[int]
+        If specified, the least recently used entries are evicted past this size.
+    callback : Optional[Callable[[Any, Any], Any]]
+        If specified, called with the key and the value of every entry that expired or was evicted.
+    """
+
+    def __init__(self,
+                 seconds: float,
+                 maxsize: t.Optional[int] = None,
+                 callback: t.Optional[t.Callable[[t.Any, t.Any], t.Any]] = None):
         self.__ttl = seconds
-        super().__init__()
+        self.maxsize = maxsize
+        self.callback = callback
+        self.__data: OrderedDict = OrderedDict()  # key -> (value, deadline), least recently used first
+        self.__deadlines: deque = deque()  # (deadline, key), earliest first, may hold stale entries
 
-    def __verify_cache_integrity(self):
-        # Have to do this in two steps...
+    def __expire(self):
         current_time = time.monotonic()
-        to_remove = [k for (k, (v, t)) in self.items() if current_time > (t + self.__ttl)]
-        for k in to_remove:
-            del self[k]
+        deadlines = self.__deadlines
+
+        while deadlines and deadlines[0][0] <= current_time:
+            deadline, key = deadlines.popleft()
+            item = self.__data.get(key)
+            # The key might have been set again since, with a later deadline
+            if item is not None and item[1] == deadline:
+                del self.__data[key]
+                if self.callback is not None:
+                    self.callback(key, item[0])
 
     def __contains__(self, key):
-        self.__verify_cache_integrity()
-        return super().__contains__(key)
+        self.__expire()
+        return key in self.__data
 
     def __getitem__(self, key):
-        self.__verify_cache_integrity()
-        return super().__getitem__(key)
+        self.__expire()
+        value, _ = self.__data[key]
+        if self.maxsize is not None:
+            self.__data.move_to_end(key)
+        return value
 
     def __setitem__(self, key, value):
-        super().__setitem__(key, (value, time.monotonic()))
+        self.__expire()
+        deadline = time.monotonic() + self.__ttl
+        self.__data[key] = (value, deadline)
+        self.__data.move_to_end(key)
+        self.__deadlines.append((deadline, key))
+
+        if self.maxsize is not None:
+            while len(self.__data) > self.maxsize:
+                evicted_key, (evicted, _) = self.__data.popitem(last=False)
+                if self.callback is not None:
+                    self.callback(evicted_key, evicted)
+
+        # Do not let stale deadlines of overwritten or evicted keys pile up
+        if len(self.__deadlines) > 2 * len(self.__data) + 64:
+            self.__deadlines = deque(sorted(((deadline, key) for key, (_, deadline) in self.__data.items()),
+                                            key=lambda entry: entry[0]))
+
+    def __delitem__(self, key):
+        del self.__data[key]
+
+    def __iter__(self):
+        self.__expire()
+        return iter(list(self.__data))
+
+    def __len__(self):
+        self.__expire()
+        return len(self.__data)
+
+
+class RedisCacheBroker:
+    """Shares the entries of :attr:`Strategy.redis` caches between processes.
+
+    Values are stored in Redis with a TTL, and every write or invalidation is published
+    so the other processes drop their local copies. If the subscription is lost, the broker
+    resubscribes with a backoff and drops every local copy, since it may have missed invalidations.
+
+    Parameters
+    ----------
+    prefix : str
+        The prefix of every key and of the channel used by the broker.
+    """
+
+    def __init__(self, prefix: str = "airy:cache"):
+        self.prefix = prefix
+        self.channel = f"{prefix}:events"
+        self.origin = uuid.uuid4().hex
+        self.redis: t.Optional[aioredis.Redis] = None
+        self._handlers: t.Dict[str, t.Callable[[dict], t.Any]] = {}
+        self._listener: t.Optional[asyncio.Task] = None
+        self._tasks: t.Set[asyncio.Task] = set()
+
+    @property
+    def is_bound(self) -> bool:
+        return self.redis is not None
+
+    def register(self, namespace: str, handler: t.Callable[[dict], t.Any]) -> None:
+        self._handlers[namespace] = handler
+
+    async def start(self, redis: aioredis.Redis) -> None:
+        """Bind the broker to a Redis connection and start listening to the other processes.
+
+        Raises if Redis can not be reached, the broker then stays unbound.
+        """
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self.redis = redis
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self.redis = None
+
+    def _dispatch(self, data: dict) -> None:
+        handler = self._handlers.get(data["namespace"])
+        if handler is not None:
+            handler(data)
+
+    async def _listen(self, pubsub) -> None:
+        backoff = 1.0
+
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    backoff = 1.0
+                    if message["type"] != "message":
+                        continue
+
+                    data = orjson.loads(message["data"])
+                    if data["origin"] == self.origin:
+                        continue
+
+                    try:
+                        self._dispatch(data)
+                    except Exception as e:
+                        logger.error(f"Failed to handle cache event {data}: {e}", exc_info=e)
+
+            except asyncio.CancelledError:
+                try:
+                    await pubsub.unsubscribe(self.channel)
+                except (aioredis.RedisError, OSError):
+                    pass
+                raise
+            except (aioredis.RedisError, OSError) as e:
+                logger.warning(f"Lost the subscription to {self.channel}, resubscribing in {backoff:.0f}s: {e}")
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+            try:
+                await pubsub.reset()
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+            except (aioredis.RedisError, OSError) as e:
+                logger.warning(f"Failed to resubscribe to {self.channel}: {e}")
+                continue
+
+            # Invalidations published in the meantime were missed
+            for namespace in self._handlers:
+                self._dispatch({"namespace": namespace, "op": "clear"})
+            logger.info(f"Resubscribed to {self.channel}")
+
+    def spawn(self, coro: t.Awaitable) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def dumps(o) -> str:
+        return orjson.dumps(o, default=repr).decode()
+
+    def key_of(self, namespace: str, key: tuple) -> str:
+        return f"{self.prefix}:{namespace}:{self.dumps(key)}"
+
+    def index_key_of(self, namespace: str, value) -> str:
+        return f"{self.prefix}:{namespace}:idx:{self.dumps(value)}"
+
+    async def publish(self, namespace: str, **data) -> None:
+        await self.redis.publish(self.channel, orjson.dumps({"origin": self.origin, "namespace": namespace, **data}))
+
+    async def get(self, redis_key: str) -> t.Optional[bytes]:
+        try:
+            return await self.redis.get(redis_key)
+        except (aioredis.RedisError, OSError) as e:
+            logger.warning(f"Failed to read cached {redis_key}: {e}")
+
+    async def set(self, namespace: str, redis_key: str, values: t.Iterable, payload: bytes, ttl: float) -> None:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(redis_key, payload, px=int(ttl * 1000))
+                for value in values:
+                    index_key = self.index_key_of(namespace, value)
+                    pipe.sadd(index_key, redis_key)
+                    pipe.pexpire(index_key, int(ttl * 1000))
+                await pipe.execute()
+            await self.publish(namespace, op="drop", key=redis_key)
+        except (aioredis.RedisError, OSError) as e:
+            logger.warning(f"Failed to store cached {redis_key}: {e}")
+
+    async def delete(self, namespace: str, redis_key: str) -> None:
+        try:
+            await self.redis.delete(redis_key)
+            await self.publish(namespace, op="drop", key=redis_key)
+        except (aioredis.RedisError, OSError) as e:
+            logger.warning(f"Failed to invalidate cached {redis_key}: {e}")
+
+    async def delete_containing(self, namespace: str, value) -> None:
+        index_key = self.index_key_of(namespace, value)
+        try:
+            redis_keys = await self.redis.smembers(index_key)
+            await self.redis.delete(index_key, *redis_keys)
+            await self.publish(namespace, op="containing", value=value)
+        except (aioredis.RedisError, OSError) as e:
+            logger.warning(f"Failed to invalidate cached entries of {index_key}: {e}")
+
+
+redis_broker = RedisCacheBroker()
 
 
 class Strategy(enum.IntEnum):
     lru = 1
     raw = 2
     timed = 3
+    redis = 4  # Local LRU backed by Redis, see RedisCacheBroker
+
+
+class CacheStats(t.NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class _KwargsMark:
+    # Separates positional from keyword arguments in a key, with a repr that is the same in every process
+    def __repr__(self):
+        return '<kwargs>'
+
+
+_kwargs_mark = _KwargsMark()
+
+
+def _key_part(o):
+    # We do not care which 'self' is passed in, only what class it is of
+    if o.__class__.__repr__ is object.__repr__:
+        return f'<{o.__class__.__module__}.{o.__class__.__name__}>'
 
+    try:
+        hash(o)
+    except TypeError:
+        return repr(o)
+    return o
 
-def cache(maxsize=128, strategy=Strategy.lru, ignore_kwargs=False):
+
+def _key_values(key):
+    # The argument values of a key, without the keyword names
+    try:
+        mark = key.index(_kwargs_mark)
+    except ValueError:
+        return key
+    return key[:mark] + key[mark + 2::2]
+
+
+def cache(maxsize=128, strategy=Strategy.lru, ignore_kwargs=False, ttl=None, refresh_after=None):
+    """Cache the results of a function.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum amount of entries. For :attr:`Strategy.timed` without a `ttl`, the lifetime of the entries.
+    strategy : Strategy
+        Where the entries are kept.
+    ignore_kwargs : bool
+        Whether keyword arguments are left out of the keys.
+    ttl : Optional[float]
+        How long an entry lives, in seconds.
+    refresh_after : Optional[float]
+        Only for coroutine functions. Once an entry is older than this, it is still returned
+        but refreshed in the background, until it is evicted after `ttl`.
+
+    With :attr:`Strategy.redis`, only values that survive a JSON round trip unchanged are shared
+    through Redis: None, bools, numbers, strings, and lists and dicts with string keys of those.
+    Anything else, e.g. tuples, datetimes or models, is only cached in the local tier, so a call
+    always returns the type the function returned.
+    """
     def decorator(func):
-        if strategy is Strategy.lru:
-            _internal_cache = LRU(maxsize)
-            _stats = _internal_cache.items()
+        hits = misses = evictions = 0
+        # Argument value -> keys it is part of, so invalidate_containing does not scan every key
+        _index: t.Dict[t.Any, t.Set[tuple]] = {}
+
+        def _unindex(key):
+            if _track_age:
+                _stored_at.pop(key, None)
+            if strategy is Strategy.redis:
+                _redis_keys.pop(redis_broker.key_of(namespace, key), None)
+
+            for part in _key_values(key):
+                keys = _index.get(part)
+                if keys is None:
+                    continue
+
+                keys.discard(key)
+                if not keys:
+                    del _index[part]
+
+        def _on_evict(key, _):
+            nonlocal evictions
+            evictions += 1
+            _unindex(key)
+
+        if strategy is Strategy.redis and not asyncio.iscoroutinefunction(func):
+            raise TypeError("Strategy.redis can only cache coroutine functions")
+        if refresh_after is not None and not asyncio.iscoroutinefunction(func):
+            raise TypeError("refresh_after can only be used with coroutine functions")
+
+        namespace = f'{func.__module__}.{func.__qualname__}'
+        _redis_ttl = ttl if ttl is not None else 300
+        # Redis key -> local key, to drop the local copies other processes tell us about
+        _redis_keys: t.Dict[str, tuple] = {}
+
+        # Only Strategy.timed evicts entries by age by itself
+        if strategy is Strategy.timed:
+            _hard_ttl = None
+        elif strategy is Strategy.redis:
+            _hard_ttl = _redis_ttl
+        else:
+            _hard_ttl = ttl
+        _track_age = refresh_after is not None or _hard_ttl is not None
+        # Key -> when it was stored, by time.monotonic()
+        _stored_at: t.Dict[tuple, float] = {}
+
+        if strategy in (Strategy.lru, Strategy.redis):
+            _internal_cache = LRU(maxsize, callback=_on_evict)
         elif strategy is Strategy.raw:
             _internal_cache = {}
-            _stats = lambda: (0, 0)
         elif strategy is Strategy.timed:
-            _internal_cache = ExpiringCache(maxsize)
-            _stats = lambda: (0, 0)
+            # Without a ttl, maxsize is the lifetime of the entries, as it always was
+            if ttl is None:
+                _internal_cache = ExpiringCache(maxsize, callback=_on_evict)
+            else:
+                _internal_cache = ExpiringCache(ttl, maxsize=maxsize, callback=_on_evict)
 
         def _make_key(args, kwargs):
-            # this is a bit of a cluster fuck
-            # we do care what 'self' parameter is when we __repr__ it
-            def _true_repr(o):
-                if o.__class__.__repr__ is object.__repr__:
-                    return f'<{o.__class__.__module__}.{o.__class__.__name__}>'
-                return repr(o)
-
-            key = [f'{func.__module__}.{func.__name__}']
-            key.extend(_true_repr(o) for o in args)
-            if not ignore_kwargs:
-                for k, v in kwargs.items():
-                    # note: this only really works for this use case in particular
-                    # I want to pass asyncpg.Connection objects to the parameters
-                    # however, they use default __repr__ and I do not care what
-                    # connection is passed in, so I needed a bypass.
-                    if k == 'connection':
-                        continue
+            key = [_key_part(o) for o in args]
+            if not ignore_kwargs and kwargs:
+                # note: this only really works for this use case in particular
+                # I want to pass asyncpg.Connection objects to the parameters
+                # however, they use default __repr__ and I do not care what
+                # connection is passed in, so I needed a bypass.
+                items = [(k, v) for k, v in kwargs.items() if k != 'connection']
+
+                # A call with only a connection shares its key with the call without any
+                if items:
+                    key.append(_kwargs_mark)
+                    for k, v in items:
+                        key.append(k)
+                        key.append(_key_part(v))
+
+            return tuple(key)
+
+        def _store(key, value):
+            _internal_cache[key] = value
+            if _track_age:
+                _stored_at[key] = time.monotonic()
+            if strategy is Strategy.redis:
+                _redis_keys[redis_broker.key_of(namespace, key)] = key
+            for part in _key_values(key):
+                _index.setdefault(part, set()).add(key)
+
+        # Key -> the task computing it, shared by every concurrent miss on that key
+        _inflight: t.Dict[tuple, asyncio.Future] = {}
+
+        async def _fetch_and_store(key, coro):
+            value = await coro
+            _store(key, value)
+            return value
+
+        def _on_fetched(key, task):
+            if _inflight.get(key) is task:
+                del _inflight[key]
+
+            # Every waiter may have been cancelled, the exception is still considered retrieved
+            if not task.cancelled():
+                task.exception()
+
+        async def _fetch_tiered(key, args, kwargs, refresh=False):
+            if not redis_broker.is_bound:
+                return await _fetch_and_store(key, func(*args, **kwargs))
+
+            redis_key = redis_broker.key_of(namespace, key)
+            # The copy in Redis is as old as the local one we are refreshing
+            payload = None if refresh else await redis_broker.get(redis_key)
+            if payload is not None:
+                value = orjson.loads(payload)
+                _store(key, value)
+                return value
 
-                    key.append(_true_repr(k))
-                    key.append(_true_repr(v))
+            value = await func(*args, **kwargs)
+            _store(key, value)
+
+            try:
+                payload = orjson.dumps(value)
+                # A tuple would come back as a list, a datetime as a string...
+                shareable = orjson.loads(payload) == value
+            except TypeError:
+                shareable = False
+
+            if shareable:
+                await redis_broker.set(namespace, redis_key, _key_values(key), payload, _redis_ttl)
+            else:
+                logger.debug(f"{namespace} returned a value that does not survive JSON, only caching it locally")
 
+            return value
 
-            return ':'.join(key)
+        def _drop_local(key):
+            try:
+                del _internal_cache[key]
+            except KeyError:
+                pass
+            _unindex(key)
+
+        def _on_broadcast(data):
+            if data["op"] == "drop":
+                key = _redis_keys.get(data["key"])
+                if key is not None:
+                    _drop_local(key)
+            elif data["op"] == "containing":
+                for key in tuple(_index.get(data["value"], ())):
+                    _drop_local(key)
+            elif data["op"] == "clear":
+                for key in tuple(_redis_keys.values()):
+                    _drop_local(key)
+
+        if strategy is Strategy.redis:
+            redis_broker.register(namespace, _on_broadcast)
+
+        async def _refresh(key, args, kwargs):
+            try:
+                if strategy is Strategy.redis:
+                    return await _fetch_tiered(key, args, kwargs, refresh=True)
+                return await _fetch_and_store(key, func(*args, **kwargs))
+            except Exception as e:
+                # The stale value is served until the entry is evicted, a later call retries
+                logger.warning(f"Failed to refresh a cached entry of {namespace}: {e}")
+                raise
+
+        def _start(key, coro):
+            task = asyncio.ensure_future(coro)
+            _inflight[key] = task
+            task.add_done_callback(partial(_on_fetched, key))
+            return task
+
+        async def _wait_shared(task):
+            # One waiter being cancelled must not cancel the fetch for everyone else
+            return await asyncio.shield(task)
 
         @wraps(func)
         def wrapper(*args, **kwargs):
+            nonlocal hits, misses
             key = _make_key(args, kwargs)
             try:
                 value = _internal_cache[key]
+
+                if _track_age:
+                    age = time.monotonic() - _stored_at.get(key, 0.0)
+                    if _hard_ttl is not None and age >= _hard_ttl:
+                        _drop_local(key)
+                        raise KeyError(key)
+
+                    if refresh_after is not None and age >= refresh_after and key not in _inflight:
+                        _start(key, _refresh(key, args, kwargs))
             except KeyError:
+                misses += 1
+                task = _inflight.get(key)
+                if task is not None:
+                    return _wait_shared(task)
+
+                if strategy is Strategy.redis:
+                    return _wait_shared(_start(key, _fetch_tiered(key, args, kwargs)))
+
                 value = func(*args, **kwargs)
 
                 if inspect.isawaitable(value):
-                    return _wrap_and_store_coroutine(_internal_cache, key, value)
+                    return _wait_shared(_start(key, _fetch_and_store(key, value)))
 
-                _internal_cache[key] = value
+                _store(key, value)
                 return value
             else:
+                hits += 1
                 if asyncio.iscoroutinefunction(func):
                     return _wrap_new_coroutine(value)
                 return value
 
         def _invalidate(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            # Other processes may hold the entry even if this one does not
+            if strategy is Strategy.redis and redis_broker.is_bound:
+                redis_broker.spawn(redis_broker.delete(namespace, redis_broker.key_of(namespace, key)))
+
             try:
-                del _internal_cache[_make_key(args, kwargs)]
+                del _internal_cache[key]
             except KeyError:
                 return False
             else:
+                _unindex(key)
                 return True
 
-        def _invalidate_containing(key):
-            to_remove = []
-            for k in _internal_cache.keys():
-                if key in k:
-                    to_remove.append(k)
-            for k in to_remove:
-                try:
-                    del _internal_cache[k]
-                except KeyError:
-                    continue
+        def _invalidate_containing(value):
+            """Invalidate every entry that was called with `value` as one of its arguments."""
+            value = _key_part(value)
+            for key in tuple(_index.get(value, ())):
+                _drop_local(key)
+
+            if strategy is Strategy.redis and redis_broker.is_bound:
+                redis_broker.spawn(redis_broker.delete_containing(namespace, value))
+
+        def _stats():
+            return CacheStats(hits, misses, evictions, len(_internal_cache))
 
         wrapper.cache = _internal_cache
         wrapper.get_key = lambda *args, **kwargs: _make_key(args, kwargs)
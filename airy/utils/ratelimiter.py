@@ -2,16 +2,22 @@ from __future__ import annotations
 
 import asyncio
 import enum
-import sys
+import logging
 import time
-import traceback
 import typing as t
-from collections import deque
+from collections import OrderedDict
 
 import hikari
 import lightbulb
 import miru
 
+if t.TYPE_CHECKING:
+    import aioredis
+
+__all__ = ("BucketType", "GCRA", "RateLimiter", "RedisRateLimiter")
+
+logger = logging.getLogger(__name__)
+
 
 class BucketType(enum.IntEnum):
     """All possible ratelimiter bucket types."""
@@ -23,10 +29,82 @@ class BucketType(enum.IntEnum):
     MEMBER = 4
 
 
+class GCRA:
+    """State of the generic cell rate algorithm for any number of keys.
+
+    Every key only stores the theoretical arrival time (TAT) of its next request,
+    so each decision is O(1), and keys whose quota fully recovered are evicted.
+    Every method takes the current time, so any clock can be used.
+
+    Parameters
+    ----------
+    period : float
+        The period after which the quota resets.
+    limit : int
+        The amount of requests allowed in a quota.
+    """
+
+    __slots__ = ("period", "limit", "interval", "tolerance", "_tats")
+
+    def __init__(self, period: float, limit: int) -> None:
+        self.period: float = period
+        self.limit: int = limit
+
+        # A request is allowed every interval, up to limit requests at once
+        self.interval: float = period / limit
+        self.tolerance: float = period - self.interval
+
+        # Key -> theoretical arrival time, least recently updated first
+        self._tats: t.OrderedDict[t.Hashable, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def evict(self, now: float) -> None:
+        """Drop the keys whose quota fully recovered."""
+        # An entry's arrival time is at most a period past its last update,
+        # so the least recently updated ones are the first to recover
+        tats = self._tats
+        while tats:
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                break
+            del tats[key]
+
+    def set(self, key: t.Hashable, tat: float) -> None:
+        """Store the theoretical arrival time of a key, e.g. one learned from another limiter."""
+        self._tats[key] = tat
+        self._tats.move_to_end(key)
+
+    def retry_after(self, key: t.Hashable, now: float) -> float:
+        """Returns how long it takes until the next request of a key is allowed."""
+        self.evict(now)
+        return max(0.0, self._tats.get(key, now) - self.tolerance - now)
+
+    def reserve(self, key: t.Hashable, now: float) -> float:
+        """Take the next slot of a key, even if it is not allowed yet. Returns how long to wait for it."""
+        self.evict(now)
+        tat = max(self._tats.get(key, now), now)
+        self.set(key, tat + self.interval)
+        return max(0.0, tat - self.tolerance - now)
+
+    def acquire(self, key: t.Hashable, now: float) -> bool:
+        """Take the next slot of a key only if it is allowed now. Returns whether it was."""
+        if self.retry_after(key, now) > 0:
+            return False
+
+        tat = max(self._tats.get(key, now), now)
+        self.set(key, tat + self.interval)
+        return True
+
+
 class RateLimiter:
     def __init__(self, period: float, limit: int, bucket: BucketType, wait: bool = True) -> None:
         """Rate Limiter implementation for Airy
 
+        Implements the generic cell rate algorithm with :class:`GCRA`
+        on the monotonic clock.
+
         Parameters
         ----------
         period : float
@@ -42,83 +120,160 @@ class RateLimiter:
         self.period: float = period
         self.limit: int = limit
         self.bucket: BucketType = bucket
-        self.wait: bool = False
+        self.wait: bool = wait
 
-        self._bucket_data = {}
+        self._bucket_data: GCRA = GCRA(period, limit)
 
-        # deque is basically a list optimized for append and pop at begin&end
-        self._queue: t.Deque[asyncio.Event] = deque()
-        self._task: t.Optional[asyncio.Task[t.Any]] = None
+    def __len__(self) -> int:
+        return len(self._bucket_data)
 
-    def _get_key(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> int:
+    def _get_key(
+            self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]
+    ) -> t.Hashable:
         """Get key for cooldown bucket"""
 
-        assert ctx_or_message.member and ctx_or_message.author
+        if self.bucket is BucketType.GLOBAL:
+            return 0
+        if self.bucket is BucketType.GUILD:
+            return ctx_or_message.guild_id
+        if self.bucket is BucketType.CHANNEL:
+            return ctx_or_message.channel_id
 
-        keys = {
-            BucketType.GLOBAL: 0,
-            BucketType.GUILD: ctx_or_message.guild_id,
-            BucketType.CHANNEL: ctx_or_message.channel_id,
-            BucketType.USER: ctx_or_message.author.id,
-            BucketType.MEMBER: int(str(ctx_or_message.guild_id) + str(ctx_or_message.member.id)),
-        }
+        assert ctx_or_message.author
+        if self.bucket is BucketType.USER:
+            return ctx_or_message.author.id
+        return ctx_or_message.guild_id, ctx_or_message.author.id
 
-        return keys[self.bucket]
+    def retry_after(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> float:
+        """Returns how long it takes, in seconds, until the next request is allowed."""
+        return self._bucket_data.retry_after(self._get_key(ctx_or_message), time.monotonic())
 
     def is_rate_limited(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> bool:
-        """Returns a boolean determining if the ratelimiter is ratelimited or not."""
-        now = time.monotonic()
+        """Returns a boolean determining if the next request would be ratelimited or not."""
+        return self.retry_after(ctx_or_message) > 0
+
+    async def acquire(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> bool:
+        """Acquire a ratelimit, block execution if ratelimited and wait is True.
+
+        Returns whether the request was allowed. With wait, requests of a key
+        are allowed in the order they arrived and this always returns True.
+        """
         key = self._get_key(ctx_or_message)
 
-        if bucket_item := self._bucket_data.get(key):
-            if bucket_item["reset_at"] <= now:
-                bucket_item["remaining"] = self.limit
-                bucket_item["reset_at"] = now + self.period
-                return False
-            return bucket_item["remaining"] <= 0
+        if self.wait:
+            delay = self._bucket_data.reserve(key, time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return True
 
-        self._bucket_data[key] = {"reset_at": now + self.period, "remaining": self.limit}
-        return False
+        return self._bucket_data.acquire(key, time.monotonic())
 
-    async def acquire(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> None:
-        """Acquire a ratelimit, block execution if ratelimited and wait is True."""
-        event = asyncio.Event()
 
-        self._queue.append(event)
+# GCRA in milliseconds on the clock of the redis server, so every process agrees on the time.
+# Returns whether the request was allowed and how long it has to wait (reserving) or retry after (denied).
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local delay = tat - tolerance - now
+if delay > 0 and ARGV[3] == '0' then
+    return {0, delay}
+end
+redis.call('SET', KEYS[1], tat + interval, 'PX', tat + interval - now)
+return {1, math.max(delay, 0)}
+"""
 
-        if self._task is None:
-            self._task = asyncio.create_task(self._iter_queue(ctx_or_message))
 
-        if self.wait:
-            await event.wait()
+class RedisRateLimiter(RateLimiter):
+    def __init__(self,
+                 name: str,
+                 period: float,
+                 limit: int,
+                 bucket: BucketType,
+                 wait: bool = True,
+                 redis: t.Optional[aioredis.Redis] = None,
+                 prefix: str = "airy:ratelimit") -> None:
+        """Rate limiter shared by every process through Redis
 
-    async def _iter_queue(self, ctx: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> None:
-        try:
-            if not self._queue:
-                self._task = None
-                return
+        Until bound to a Redis connection, or while Redis is unreachable,
+        it limits locally like :class:`RateLimiter`.
+
+        Parameters
+        ----------
+        name : str
+            Identifies the limiter, must be the same in every process.
+        period : float
+            The period, in seconds, after which the quota resets.
+        limit : int
+            The amount of requests allowed in a quota.
+        bucket : BucketType
+            The bucket to handle this under.
+        wait : bool
+            Determines if the ratelimiter should wait in
+            case of hitting a ratelimit.
+        redis : Optional[aioredis.Redis]
+            The redis connection to use, see :meth:`bind`.
+        prefix : str
+            The prefix of the keys in Redis.
+        """
+        super().__init__(period, limit, bucket, wait)
+        self.name = name
+        self.prefix = prefix
+        self.redis: t.Optional[aioredis.Redis] = None
+        self._script = None
+
+        # Arrival times Redis denied requests with, denials in between never reach Redis
+        self._denied: GCRA = GCRA(period, limit)
+
+        if redis is not None:
+            self.bind(redis)
 
-            if self.is_rate_limited(ctx):
-                # Sleep until ratelimit expires
-                key = self._get_key(ctx)
-                bucket_item = self._bucket_data[key]
-                sleep_time = bucket_item["reset_at"] - time.monotonic()
-                await asyncio.sleep(sleep_time)
+    def bind(self, redis: aioredis.Redis) -> None:
+        """Use this redis connection from now on."""
+        self.redis = redis
+        self._script = redis.register_script(_GCRA_SCRIPT)
 
-            # Set events while not ratelimited
-            while not self.is_rate_limited(ctx) and self._queue:
+    def _redis_key(self, key: t.Hashable) -> str:
+        if isinstance(key, tuple):
+            key = ":".join(map(str, key))
+        return f"{self.prefix}:{self.name}:{key}"
 
-                key = self._get_key(ctx)
+    def retry_after(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> float:
+        """Returns how long it takes, in seconds, until the next request is allowed, as far as this process knows."""
+        if self.redis is None:
+            return super().retry_after(ctx_or_message)
 
-                if bucket_item := self._bucket_data.get(key):
-                    bucket_item["remaining"] -= 1
-                else:
-                    self._bucket_data[key] = {"reset_at": time.monotonic() + self.period, "remaining": self.limit - 1}
+        return self._denied.retry_after(self._get_key(ctx_or_message), time.monotonic())
 
-                self._queue.popleft().set()
+    async def acquire(self, ctx_or_message: t.Union[lightbulb.Context, miru.Context, hikari.PartialMessage]) -> bool:
+        if self.redis is None:
+            return await super().acquire(ctx_or_message)
 
-            self._task = None
+        now = time.monotonic()
+        key = self._get_key(ctx_or_message)
+
+        if not self.wait and self._denied.retry_after(key, now) > 0:
+            return False
 
+        try:
+            allowed, delay = await self._script(
+                keys=[self._redis_key(key)],
+                args=[int(self._denied.interval * 1000), int(self._denied.tolerance * 1000), int(self.wait)],
+            )
         except Exception as e:
-            print(f"Task Exception was never retrieved: {e}", file=sys.stderr)
-            print(traceback.format_exc(), file=sys.stderr)
+            logger.warning(f"Redis rate limiter {self.name} is unavailable, limiting locally: {e}")
+            return await super().acquire(ctx_or_message)
+
+        if not allowed:
+            # The arrival time in Redis is a tolerance past the end of the denial
+            self._denied.set(key, now + delay / 1000 + self._denied.tolerance)
+            return False
+
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        return True
@@ -0,0 +1,58 @@
+"""Compare lookups in ExpiringCache against the previous dict that scanned every entry.
+
+Run from the repository root::
+
+    python -m benchmarks.expiring_cache
+"""
+import time
+import timeit
+
+from airy.utils.cache import ExpiringCache
+
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+class ScanningExpiringCache(dict):
+    """The cache before the deadline queue, dropping expired entries with a full scan on every access."""
+
+    def __init__(self, seconds: float) -> None:
+        self.__ttl = seconds
+        super().__init__()
+
+    def __verify_cache_integrity(self) -> None:
+        current_time = time.monotonic()
+        to_remove = [k for (k, (v, t)) in self.items() if current_time > (t + self.__ttl)]
+        for k in to_remove:
+            del self[k]
+
+    def __contains__(self, key) -> bool:
+        self.__verify_cache_integrity()
+        return super().__contains__(key)
+
+    def __getitem__(self, key):
+        self.__verify_cache_integrity()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, (value, time.monotonic()))
+
+
+def lookup_time(cls: type, size: int) -> float:
+    cache = cls(3600.0)
+    for i in range(size):
+        cache[i] = i
+
+    # The scan is linear in the size, keep its runs short
+    number = 200 if cls is ScanningExpiringCache and size >= 10_000 else 20_000
+    return min(timeit.repeat(lambda: cache[size // 2], number=number, repeat=3)) / number
+
+
+def main() -> None:
+    for size in SIZES:
+        old = lookup_time(ScanningExpiringCache, size)
+        new = lookup_time(ExpiringCache, size)
+        print(f"{size:>7} entries: scan {old * 1e6:10.2f} us  ExpiringCache {new * 1e6:.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Stress the RateLimiter with 100k distinct members.
+
+Every member is allowed once on the first pass and denied on the second one.
+Once the period is over, a single new request evicts every recovered key.
+Run from the repository root::
+
+    python -m benchmarks.ratelimiter_stress
+"""
+import asyncio
+import time
+
+from airy.utils import BucketType, RateLimiter
+
+MEMBERS = 100_000
+PERIOD = 2.0
+
+
+class FakeAuthor:
+    __slots__ = ("id",)
+
+    def __init__(self, id_: int) -> None:
+        self.id = id_
+
+
+class FakeMessage:
+    __slots__ = ("guild_id", "channel_id", "author")
+
+    def __init__(self, guild_id: int, author_id: int) -> None:
+        self.guild_id = guild_id
+        self.channel_id = 1
+        self.author = FakeAuthor(author_id)
+
+
+async def run_pass(limiter: RateLimiter, messages: list) -> tuple:
+    start = time.perf_counter()
+    allowed = 0
+    for message in messages:
+        allowed += await limiter.acquire(message)
+    return allowed, time.perf_counter() - start
+
+
+async def main() -> None:
+    limiter = RateLimiter(PERIOD, 1, BucketType.MEMBER, wait=False)
+    messages = [FakeMessage(7, i) for i in range(MEMBERS)]
+
+    allowed, elapsed = await run_pass(limiter, messages)
+    print(f"first pass: {allowed} allowed, {elapsed / MEMBERS * 1e6:.2f} us/decision, {len(limiter)} keys")
+    assert allowed == MEMBERS
+
+    allowed, elapsed = await run_pass(limiter, messages)
+    print(f"second pass: {MEMBERS - allowed} denied, {elapsed / MEMBERS * 1e6:.2f} us/decision")
+    assert allowed == 0
+
+    await asyncio.sleep(PERIOD + 0.1)
+    assert await limiter.acquire(FakeMessage(7, -1))
+    print(f"after the period: {len(limiter)} key")
+    assert len(limiter) == 1
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
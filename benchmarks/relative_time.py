@@ -0,0 +1,74 @@
+"""Compare the relative time parser against the previous Levenshtein scan.
+
+Checks that both agree on every word at an edit distance of one from a unit,
+then times a few typical inputs. Run from the repository root::
+
+    python -m benchmarks.relative_time
+"""
+import random
+import re
+import timeit
+
+import Levenshtein
+
+from airy.core.scheduler import parse_relative_time
+from airy.core.scheduler.consts import time_letter_dict, time_word_dict
+
+_compiled = re.compile(r"(\d+(?:[.,]\d+)?)\s?(\w+)")
+
+INPUTS = ["10m", "1h", "2 days", "3 hours 20 minutes", "in 5 mins do the thing", "1 week"]
+
+
+def levenshtein_parse(time_string: str) -> float:
+    """The parser before the precomputed variants, scanning every unit with Levenshtein.distance."""
+    time = 0.0
+
+    for val, category in _compiled.findall(time_string):
+        val = float(val.replace(",", "."))
+
+        if len(category) == 1:
+            time += time_letter_dict.get(category, 0) * val
+        else:
+            for string in time_word_dict:
+                if Levenshtein.distance(category.lower(), string.lower()) <= 1:
+                    time += time_word_dict[string] * val
+                    break
+
+    return time
+
+
+def misspellings(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    units = list(time_word_dict)
+    words = units + ["hours", "mins", "minutes", "seconds", "Hours", "MINUTES", "xyz"]
+
+    for _ in range(count):
+        word = rng.choice(units)
+        i = rng.randrange(len(word) + 1)
+        op = rng.randrange(3)
+
+        if op == 0:
+            word = word[:i] + rng.choice(alphabet) + word[i:]
+        elif i < len(word):
+            word = word[:i] + (rng.choice(alphabet) if op == 1 else "") + word[i + 1:]
+
+        words.append(word)
+
+    return words
+
+
+def main() -> None:
+    parse = parse_relative_time.__wrapped__
+
+    mismatches = [word for word in misspellings(20000) if levenshtein_parse(f"3 {word}") != parse(f"3 {word}")]
+    print(f"mismatches: {len(mismatches)} {mismatches[:5]}")
+
+    number = 20000
+    for name, func in (("levenshtein", levenshtein_parse), ("variants", parse), ("variants+lru", parse_relative_time)):
+        elapsed = min(timeit.repeat(lambda: [func(s) for s in INPUTS], number=number, repeat=3))
+        print(f"{name:>12}: {elapsed / number / len(INPUTS) * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
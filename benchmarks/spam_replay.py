@@ -0,0 +1,89 @@
+"""Replay 100k guild messages through the SpamChecker.
+
+One message in ten is the same spammer posting the same content in a single channel,
+the rest is regular chatter spread over 50 guilds. Run from the repository root::
+
+    python -m benchmarks.spam_replay
+"""
+import datetime
+import random
+import time
+import tracemalloc
+
+from airy.extensions.moderation.checker import SpamChecker
+
+MESSAGES = 100_000
+GUILDS = 50
+SPAM_EVERY = 10
+
+
+class FakeAuthor:
+    __slots__ = ("id",)
+
+    def __init__(self, id_: int) -> None:
+        self.id = id_
+
+
+class FakeMessage:
+    __slots__ = ("guild_id", "channel_id", "author", "content", "created_at")
+
+    def __init__(self, guild_id: int, channel_id: int, author_id: int, content: str,
+                 created_at: datetime.datetime) -> None:
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.author = FakeAuthor(author_id)
+        self.content = content
+        self.created_at = created_at
+
+
+def make_messages(now: datetime.datetime, seed: int = 7) -> list:
+    """100k messages, 3ms apart, so the replay covers five minutes."""
+    rng = random.Random(seed)
+    messages = []
+
+    for i in range(MESSAGES):
+        created_at = now + datetime.timedelta(milliseconds=i * 3)
+
+        if i % SPAM_EVERY == 0:
+            messages.append(FakeMessage(GUILDS, GUILDS * 100, 1, "buy nitro", created_at))
+        else:
+            guild_id = rng.randrange(GUILDS)
+            messages.append(FakeMessage(guild_id,
+                                        guild_id * 100 + rng.randrange(20),
+                                        2 + rng.randrange(20_000),
+                                        f"hello {rng.random()}",
+                                        created_at))
+
+    return messages
+
+
+def main() -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    messages = make_messages(now)
+
+    checker = SpamChecker()
+    start = time.perf_counter()
+    flagged = [checker.is_spamming(message) for message in messages]
+    elapsed = time.perf_counter() - start
+
+    spam_flagged = sum(flagged[::SPAM_EVERY])
+    print(f"{elapsed / MESSAGES * 1e6:.2f} us/message")
+    print(f"flagged {spam_flagged} of {MESSAGES // SPAM_EVERY} spam messages "
+          f"and {sum(flagged) - spam_flagged} of the others")
+
+    tracemalloc.start()
+    checker = SpamChecker()
+    for message in messages:
+        checker.is_spamming(message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    live = len(checker.by_user) + len(checker.by_content)
+    # A message after every window recovered evicts the idle keys
+    checker.is_spamming(FakeMessage(1, 100, 5, "x", now + datetime.timedelta(minutes=10)))
+    idle = len(checker.by_user) + len(checker.by_content)
+    print(f"peak {peak / 1e6:.1f} MB, {live} live keys, {idle} after idling")
+
+
+if __name__ == "__main__":
+    main()
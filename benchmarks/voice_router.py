@@ -0,0 +1,102 @@
+"""Compare routing voice state updates by channel id against every room waiting on every event.
+
+Before the router, each live room awaited the next VoiceStateUpdateEvent itself, so every event
+woke up every room. Run from the repository root::
+
+    python -m benchmarks.voice_router
+"""
+import asyncio
+import random
+import time
+import types
+
+from airy.extensions.rooms import cache, on_voice_state_update
+from airy.extensions.rooms.room import VoiceRoom
+
+ROOMS = 1_000
+EVENTS = 5_000
+OWNER_ID = 1
+
+
+def make_events() -> list:
+    """Alternating joins and leaves of fresh users, half of them in channels that are not rooms."""
+    rng = random.Random(1)
+    events = []
+
+    for i in range(EVENTS):
+        channel_id = 1 + rng.randrange(ROOMS * 2)
+        old = types.SimpleNamespace(channel_id=None if i % 2 else channel_id)
+        new = types.SimpleNamespace(channel_id=channel_id if i % 2 else None, user_id=10_000 + i, member=None)
+        events.append(types.SimpleNamespace(guild_id=0, old_state=old, state=new))
+
+    return events
+
+
+def make_room(channel_id: int) -> VoiceRoom:
+    # Skips __init__, which creates the channel through the REST API
+    room = VoiceRoom.__new__(VoiceRoom)
+    room.cache = cache
+    room.owner_id = OWNER_ID
+    room.members = {OWNER_ID}
+    room._is_live = True
+    room.channel = types.SimpleNamespace(id=channel_id)
+    return room
+
+
+async def waiting_rooms(events: list) -> float:
+    waiters = []
+
+    async def room_loop(channel_id: int) -> None:
+        members = [OWNER_ID]
+        while True:
+            future = asyncio.get_running_loop().create_future()
+            waiters.append(future)
+            event = await future
+
+            if event.state.channel_id == channel_id:
+                members.append(event.state.user_id)
+            if event.old_state.channel_id == channel_id and event.state.user_id in members:
+                members.remove(event.state.user_id)
+
+    tasks = [asyncio.create_task(room_loop(channel_id)) for channel_id in range(1, ROOMS + 1)]
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for event in events:
+        woken = waiters[:]
+        waiters.clear()
+        for future in woken:
+            future.set_result(event)
+        # Let every room handle the event and wait again
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+    return elapsed
+
+
+async def routed_rooms(events: list) -> float:
+    for channel_id in range(1, ROOMS + 1):
+        cache.add_room(make_room(channel_id))
+
+    start = time.perf_counter()
+    for event in events:
+        await on_voice_state_update(event)
+    elapsed = time.perf_counter() - start
+
+    for channel_id in range(1, ROOMS + 1):
+        cache.remove_room(channel_id)
+    return elapsed
+
+
+async def main() -> None:
+    events = make_events()
+    for name, run in (("waiting rooms", waiting_rooms), ("router", routed_rooms)):
+        elapsed = await run(events)
+        print(f"{name:>13}: {elapsed / EVENTS * 1e6:9.1f} us/event with {ROOMS} rooms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())